@@ -1,17 +1,84 @@
-from django.contrib import admin
-from .models import Fabric, FabricChangeLog, WorkerProductLog
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+
+from . import importer
+from .models import Fabric, FabricChangeLog, Job, WorkerProductLog, Product, ProductType, MaterialForProduct
+
+
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(label="Файл CSV/XLSX")
+    dry_run = forms.BooleanField(label="Только проверить", required=False, initial=True)
+
+
+class CatalogImportMixin:
+    """Кнопка «Импорт» в списке и страница загрузки файла (см. app.importer)."""
+    import_kind = None
+    change_list_template = 'admin/app/change_list_import.html'
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        opts = self.model._meta
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = importer.import_rows(
+                    self.import_kind,
+                    importer.read_file(upload.file, upload.name),
+                    dry_run=form.cleaned_data['dry_run'],
+                    user=request.user,
+                )
+            except importer.ImportFileError as exc:
+                form.add_error('file', str(exc))
+            if result and not result.errors and not result.dry_run:
+                messages.success(
+                    request,
+                    f"Импорт завершён: новых {result.created}, обновлено {result.updated}, "
+                    f"начальных остатков {result.opening_balances}.",
+                )
+                return redirect(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
+        return TemplateResponse(request, 'admin/app/import_catalog.html', {
+            **self.admin_site.each_context(request),
+            'opts': opts,
+            'title': f"Импорт: {opts.verbose_name_plural}",
+            'form': form,
+            'result': result,
+        })
 
 
 @admin.register(Fabric)
-class FabricAdmin(admin.ModelAdmin):
+class FabricAdmin(CatalogImportMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'quantity', 'unit', 'price', 'image')
     list_filter = ('unit',)
     search_fields = ('name',)
+    import_kind = 'fabrics'
+
+
+@admin.register(Product)
+class ProductAdmin(CatalogImportMixin, admin.ModelAdmin):
+    list_display = ('id', 'name', 'quantity', 'unit', 'price_per_unit', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('name',)
+    import_kind = 'products'
 
 
 @admin.register(FabricChangeLog)
 class FabricChangeLogAdmin(admin.ModelAdmin):
     list_display = ('fabric', 'action', 'change_weight', 'change_length', 'user', 'timestamp')
+    list_select_related = ('fabric', 'user')
     list_filter = ('action', 'timestamp', 'user')
     search_fields = ('fabric__name', 'user__username')
 
@@ -19,5 +86,32 @@ class FabricChangeLogAdmin(admin.ModelAdmin):
 @admin.register(WorkerProductLog)
 class WorkerProductLogAdmin(admin.ModelAdmin):
     list_display = ('worker', 'product_name', 'quantity', 'date')
+    list_select_related = ('worker', 'product')
     list_filter = ('date', 'worker')
     search_fields = ('product_name', 'worker__username')
+
+
+class MaterialForProductInline(admin.TabularInline):
+    model = MaterialForProduct
+    extra = 1
+    autocomplete_fields = ('fabric',)
+
+    def get_queryset(self, request):
+        # __str__ строки рецепта берёт имена типа и ткани
+        return super().get_queryset(request).select_related('product_type', 'fabric')
+
+
+@admin.register(ProductType)
+class ProductTypeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name')
+    search_fields = ('name',)
+    inlines = [MaterialForProductInline]
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'run_at', 'finished_at', 'user')
+    list_select_related = ('user',)
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'error')
+    readonly_fields = ('started_at', 'finished_at', 'worker', 'result', 'error')
@@ -0,0 +1,108 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Fabric, Product, MaterialTransaction, ProductTransaction
+
+# алерты лежат под версией, как фрагменты дашборда: движение склада меняет версию, а не
+# правит общий словарь в кэше, — параллельные движения не затирают друг друга
+ALERTS_VERSION_KEY = 'stock-alerts:version'
+ALERTS_CACHE_KEY = 'stock-alerts:{}'
+ALERTS_CACHE_TIMEOUT = 60 * 60
+
+
+def _window_days():
+    return getattr(settings, 'LOW_STOCK_WINDOW_DAYS', 30)
+
+
+def _horizon_days():
+    return getattr(settings, 'LOW_STOCK_HORIZON_DAYS', 7)
+
+
+def _low_stock(model, ledger, fk):
+    """
+    Один запрос на таблицу: позиции ниже точки заказа или такие, у которых
+    при текущем расходе (сумма OUT за окно) запаса хватит меньше чем на horizon дней.
+    Сравнение без деления: quantity * window < usage * horizon.
+    """
+    window, horizon = _window_days(), _horizon_days()
+    since = timezone.now() - timedelta(days=window)
+    usage = (
+        ledger.objects
+        .filter(**{fk: OuterRef('pk')}, transaction_type=ledger.OUT, created_at__gte=since)
+        .values(fk)
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    decimal = DecimalField(max_digits=14, decimal_places=2)
+    return (
+        model.objects
+        .annotate(usage=Coalesce(Subquery(usage, output_field=decimal), Value(Decimal('0')), output_field=decimal))
+        .alias(
+            # целочисленное деление SQLite обрезало бы порог — обе части только умножаются
+            stock_days=ExpressionWrapper(F('quantity') * window, output_field=decimal),
+            usage_days=ExpressionWrapper(F('usage') * horizon, output_field=decimal),
+        )
+        .filter(
+            Q(reorder_point__gt=0, quantity__lte=F('reorder_point'))
+            | Q(usage__gt=0, stock_days__lt=F('usage_days'))
+        )
+        .values('pk', 'name', 'quantity', 'unit', 'reorder_point', 'usage')
+    )
+
+
+def _as_alert(kind, row):
+    window = _window_days()
+    daily = row['usage'] / window if row['usage'] else None
+    return {
+        'kind': kind,
+        'pk': row['pk'],
+        'name': row['name'],
+        'quantity': row['quantity'],
+        'unit': row['unit'],
+        'reorder_point': row['reorder_point'],
+        'days_left': int(row['quantity'] / daily) if daily else None,
+    }
+
+
+def _version():
+    version = cache.get(ALERTS_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(ALERTS_VERSION_KEY, version, None)
+    return version
+
+
+def sweep():
+    """Полный пересчёт: все ткани и продукты с низким остатком. Результат кладётся в кэш."""
+    # версия берётся до чтения остатков: если движение сменит её во время пересчёта,
+    # устаревший результат ляжет под старой версией и его никто не прочитает
+    version = _version()
+    alerts = {}
+    for kind, model, ledger, fk in (
+        ('fabric', Fabric, MaterialTransaction, 'fabric'),
+        ('product', Product, ProductTransaction, 'product'),
+    ):
+        for row in _low_stock(model, ledger, fk):
+            alerts[f"{kind}:{row['pk']}"] = _as_alert(kind, row)
+    cache.set(ALERTS_CACHE_KEY.format(version), alerts, ALERTS_CACHE_TIMEOUT)
+    return alerts
+
+
+def invalidate():
+    """Сбросить закэшированные алерты после движения; следующий показ панели сделает sweep."""
+    cache.set(ALERTS_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def current_alerts():
+    """Алерты для панели на дашборде: из кэша, при промахе — полный sweep."""
+    alerts = cache.get(ALERTS_CACHE_KEY.format(_version()))
+    if alerts is None:
+        alerts = sweep()
+    return sorted(alerts.values(), key=lambda a: (a['days_left'] is None, a['days_left'] or 0, a['name']))
@@ -0,0 +1,390 @@
+"""
+JSON API v1 для планшетов и сканеров склада.
+
+    GET  /api/v1/<resource>/             список (?after=<id>&limit=<n>, фильтры)
+    POST /api/v1/<resource>/             создать одну запись
+    GET  /api/v1/<resource>/<id>/        одна запись
+    POST /api/v1/<resource>/bulk/        создать пачку записей (всё или ничего)
+
+Авторизация — обычная сессия Django (+ CSRF), права — те же роли admin/worker.
+Движения склада идут через app.stock / app.production, как и HTML-формы.
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .decorators import has_role, is_admin_or_superuser
+from .forms import FabricForm, ProductForm
+from .models import Fabric, Product, WorkerProductLog, MaterialTransaction, ProductTransaction
+from .production import MaterialShortage, bulk_log_production, log_production
+from .stock import InsufficientStock, move_fabric, move_product
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_BULK = 500
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+# --- Вспомогательное --------------------------------------------------------
+
+def _json_response(request, data, status=200):
+    """JsonResponse с ETag; если If-None-Match совпал — 304 без тела."""
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    if request.method == 'GET' and etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def _read_json(request):
+    try:
+        return json.loads(request.body or b'null')
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError("Некорректный JSON.")
+
+
+def _decimal(value, field):
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ApiError(f"{field}: неверное число.")
+    if not amount.is_finite() or amount <= 0:
+        raise ApiError(f"{field}: должно быть больше нуля.")
+    return amount.quantize(Decimal('0.01'))
+
+
+def _pk(value, field):
+    """id из тела запроса: целое число или None, если поле не передано."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+        raise ApiError(f"{field}: неверный id.")
+    return int(value)
+
+
+def _form_errors(form):
+    return ApiError("Ошибка валидации.", errors=form.errors.get_json_data())
+
+
+def _can_read(user):
+    return is_admin_or_superuser(user) or has_role(user, 'worker')
+
+
+# --- Ресурсы ----------------------------------------------------------------
+
+class Resource:
+    model = None
+    fields = ()
+    filters = {}          # параметр запроса → lookup
+    bulk = False
+
+    def queryset(self, request):
+        if not _can_read(request.user):
+            raise PermissionDenied
+        # only(): в SQL уходят только поля, которые отдаёт API (worker_id → worker)
+        only = [f[:-3] if f.endswith('_id') and f != 'id' else f for f in self.fields]
+        return self.model.objects.only(*only)
+
+    def filter_value(self, param, lookup, value):
+        """Значение фильтра из GET, приведённое полем модели; неверное — ApiError (400)."""
+        if lookup == 'is_active':
+            return value.lower() in ('1', 'true', 'yes')
+        field = self.model._meta.get_field(lookup.split('__')[0])
+        try:
+            return field.to_python(value)
+        except ValidationError:
+            raise ApiError(f"{param}: неверное значение.")
+
+    def serialize(self, obj):
+        return {field: getattr(obj, field) for field in self.fields}
+
+    def create(self, request, data):
+        raise ApiError("Метод не поддерживается.", status=405)
+
+    def create_many(self, request, items):
+        with transaction.atomic():
+            return [self._create_indexed(request, index, item) for index, item in enumerate(items)]
+
+    def _create_indexed(self, request, index, item):
+        try:
+            return self.create(request, item)
+        except ApiError as exc:
+            exc.extra.setdefault('index', index)
+            raise
+
+
+class FabricResource(Resource):
+    model = Fabric
+    fields = ('id', 'name', 'quantity', 'price', 'unit', 'reorder_point', 'created_at')
+    filters = {'unit': 'unit'}
+
+    def create(self, request, data):
+        if not is_admin_or_superuser(request.user):
+            raise PermissionDenied
+        if not isinstance(data, dict):
+            raise ApiError("Ожидается объект.")
+        form = FabricForm(data)
+        if not form.is_valid():
+            raise _form_errors(form)
+        return form.save()
+
+
+class ProductResource(Resource):
+    model = Product
+    fields = ('id', 'name', 'price_per_unit', 'quantity', 'unit', 'product_type_id', 'reorder_point',
+              'is_active', 'created_at')
+    filters = {'is_active': 'is_active'}
+
+    def create(self, request, data):
+        if not is_admin_or_superuser(request.user):
+            raise PermissionDenied
+        if not isinstance(data, dict):
+            raise ApiError("Ожидается объект.")
+        form = ProductForm(data)
+        if not form.is_valid():
+            raise _form_errors(form)
+        return form.save()
+
+
+class WorkerProductLogResource(Resource):
+    model = WorkerProductLog
+    fields = ('id', 'worker_id', 'product_id', 'product_name', 'quantity', 'date')
+    filters = {'worker': 'worker_id', 'product': 'product_id', 'date_from': 'date__gte', 'date_to': 'date__lte'}
+    bulk = True
+
+    def queryset(self, request):
+        qs = super().queryset(request)
+        if not is_admin_or_superuser(request.user):
+            qs = qs.filter(worker=request.user)  # работник видит только свои логи
+        return qs
+
+    def _related(self, request, items):
+        """Работники и продукты для всех записей двумя запросами: ({pk: User}, {pk: Product})."""
+        def pks(field):
+            found = set()
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    pk = _pk(item.get(field), field)
+                except ApiError:
+                    continue  # ошибку с индексом записи вернёт _entry
+                if pk is not None:
+                    found.add(pk)
+            return list(found)
+
+        workers = {}
+        if is_admin_or_superuser(request.user):  # логи можно записывать только на работников
+            workers = User.objects.filter(groups__name='worker').in_bulk(pks('worker'))
+        products = Product.objects.filter(is_active=True).in_bulk(pks('product'))
+        return workers, products
+
+    def _entry(self, request, data, workers, products):
+        if not isinstance(data, dict):
+            raise ApiError("Ожидается объект.")
+        if is_admin_or_superuser(request.user) and data.get('worker') not in (None, ''):
+            worker = workers.get(_pk(data['worker'], 'worker'))
+            if worker is None:
+                raise ApiError("worker: работник не найден.")
+        elif has_role(request.user, 'worker'):
+            worker = request.user
+        elif is_admin_or_superuser(request.user):
+            raise ApiError("worker: обязательное поле.")
+        else:
+            raise PermissionDenied
+        product = products.get(_pk(data.get('product'), 'product'))
+        if product is None:
+            raise ApiError("product: продукт не найден.")
+        try:
+            quantity = int(data.get('quantity'))
+        except (TypeError, ValueError):
+            raise ApiError("quantity: неверное число.")
+        if quantity <= 0:
+            raise ApiError("quantity: должно быть больше нуля.")
+        return worker, product, quantity
+
+    def create(self, request, data):
+        worker, product, quantity = self._entry(request, data, *self._related(request, [data]))
+        try:
+            return log_production(worker, product, quantity, user=request.user)
+        except MaterialShortage as exc:
+            raise ApiError(f"Не хватает материалов: {exc}", status=409)
+
+    def create_many(self, request, items):
+        workers, products = self._related(request, items)
+        entries = [
+            self._create_indexed_entry(request, index, item, workers, products)
+            for index, item in enumerate(items)
+        ]
+        try:
+            return bulk_log_production(entries, user=request.user)
+        except MaterialShortage as exc:
+            raise ApiError(f"Не хватает материалов: {exc}", status=409)
+
+    def _create_indexed_entry(self, request, index, item, workers, products):
+        try:
+            return self._entry(request, item, workers, products)
+        except ApiError as exc:
+            exc.extra.setdefault('index', index)
+            raise
+
+
+class MaterialTransactionResource(Resource):
+    model = MaterialTransaction
+    fields = ('id', 'fabric_id', 'user_id', 'transaction_type', 'amount', 'note', 'created_at')
+    filters = {'fabric': 'fabric_id', 'type': 'transaction_type'}
+    bulk = True
+
+    def queryset(self, request):
+        if not is_admin_or_superuser(request.user):
+            raise PermissionDenied
+        return super().queryset(request)
+
+    def create(self, request, data):
+        if not is_admin_or_superuser(request.user):
+            raise PermissionDenied
+        if not isinstance(data, dict):
+            raise ApiError("Ожидается объект.")
+        fabric = Fabric.objects.filter(pk=_pk(data.get('fabric'), 'fabric')).only('pk').first()
+        if fabric is None:
+            raise ApiError("fabric: материал не найден.")
+        transaction_type = data.get('transaction_type')
+        if transaction_type not in (MaterialTransaction.IN, MaterialTransaction.OUT):
+            raise ApiError("transaction_type: IN или OUT.")
+        amount = _decimal(data.get('amount'), 'amount')
+        try:
+            return move_fabric(fabric, amount, transaction_type, user=request.user, note=data.get('note') or '')
+        except InsufficientStock as exc:
+            raise ApiError(f"Недостаточно на складе (доступно {exc.available}).", status=409)
+
+
+class ProductTransactionResource(Resource):
+    model = ProductTransaction
+    fields = ('id', 'product_id', 'user_id', 'transaction_type', 'amount', 'note', 'created_at')
+    filters = {'product': 'product_id', 'type': 'transaction_type'}
+    bulk = True
+
+    def queryset(self, request):
+        if not is_admin_or_superuser(request.user):
+            raise PermissionDenied
+        return super().queryset(request)
+
+    def create(self, request, data):
+        if not is_admin_or_superuser(request.user):
+            raise PermissionDenied
+        if not isinstance(data, dict):
+            raise ApiError("Ожидается объект.")
+        product = Product.objects.filter(pk=_pk(data.get('product'), 'product')).only('pk').first()
+        if product is None:
+            raise ApiError("product: продукт не найден.")
+        transaction_type = data.get('transaction_type')
+        if transaction_type not in (ProductTransaction.IN, ProductTransaction.OUT):
+            raise ApiError("transaction_type: IN или OUT.")
+        amount = _decimal(data.get('amount'), 'amount')
+        try:
+            return move_product(product, amount, transaction_type, user=request.user, note=data.get('note') or '')
+        except InsufficientStock as exc:
+            raise ApiError(f"Движение отклонено (остаток {exc.available}).", status=409)
+
+
+RESOURCES = {
+    'fabrics': FabricResource(),
+    'products': ProductResource(),
+    'logs': WorkerProductLogResource(),
+    'material-transactions': MaterialTransactionResource(),
+    'product-transactions': ProductTransactionResource(),
+}
+
+
+# --- Views ------------------------------------------------------------------
+
+def _api_view(func):
+    def wrapper(request, resource, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "Требуется вход."}, status=401)
+        res = RESOURCES.get(resource)
+        if res is None:
+            return JsonResponse({'error': "Неизвестный ресурс."}, status=404)
+        try:
+            return func(request, res, *args, **kwargs)
+        except ApiError as exc:
+            return JsonResponse({'error': str(exc), **exc.extra}, status=exc.status)
+        except PermissionDenied:
+            return JsonResponse({'error': "Недостаточно прав."}, status=403)
+        except Http404:
+            return JsonResponse({'error': "Не найдено."}, status=404)
+        except ValidationError as exc:
+            return JsonResponse({'error': exc.messages}, status=400)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+@_api_view
+def api_list(request, res):
+    if request.method == 'POST':
+        obj = res.create(request, _read_json(request))
+        return JsonResponse(res.serialize(obj), status=201)
+    if request.method != 'GET':
+        raise ApiError("Метод не поддерживается.", status=405)
+
+    qs = res.queryset(request)
+    for param, lookup in res.filters.items():
+        value = request.GET.get(param)
+        if value not in (None, ''):
+            qs = qs.filter(**{lookup: res.filter_value(param, lookup, value)})
+
+    try:
+        limit = min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        raise ApiError("limit/after: неверное число.")
+    if limit <= 0:
+        raise ApiError("limit: должно быть больше нуля.")
+
+    # Keyset-пагинация по id: WHERE id > after ORDER BY id LIMIT n — без OFFSET
+    rows = list(qs.filter(pk__gt=after).order_by('pk')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return _json_response(request, {
+        'results': [res.serialize(obj) for obj in rows],
+        'next_after': rows[-1].pk if has_more else None,
+    })
+
+
+@_api_view
+def api_detail(request, res, pk):
+    if request.method != 'GET':
+        raise ApiError("Метод не поддерживается.", status=405)
+    obj = get_object_or_404(res.queryset(request), pk=pk)
+    return _json_response(request, res.serialize(obj))
+
+
+@_api_view
+def api_bulk(request, res):
+    if request.method != 'POST':
+        raise ApiError("Метод не поддерживается.", status=405)
+    if not res.bulk:
+        raise ApiError("Пакетное создание не поддерживается.", status=405)
+    items = _read_json(request)
+    if not isinstance(items, list) or not items:
+        raise ApiError("Ожидается непустой список.")
+    if len(items) > MAX_BULK:
+        raise ApiError(f"Не больше {MAX_BULK} записей за раз.")
+    created = res.create_many(request, items)
+    return JsonResponse({'results': [res.serialize(obj) for obj in created]}, status=201)
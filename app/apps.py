@@ -16,4 +16,7 @@ class AppConfig(AppConfig):
 
         post_migrate.connect(create_default_groups, sender=self)
 
+        from . import signals  # noqa: F401  регистрируем обработчики WorkerProductLog
+        from . import tasks  # noqa: F401  регистрируем фоновые задачи (app.jobs)
+
 
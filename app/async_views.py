@@ -0,0 +1,202 @@
+"""
+Async-варианты читающих view для запуска под ASGI (DJANGO_ASYNC_VIEWS=1, см. app/urls.py):
+дашборды, карточка продукта и истории движений.
+
+Данные загружаются асинхронным ORM (aget, aaggregate, async for); независимые
+запросы и обращения к кэшу собираются в asyncio.gather. Блоки дашборда, которые
+уже лежат в кэше фрагментов, не загружаются заранее: на их месте в контексте ленивые
+querysets и итоги, как у синхронного view, — если фрагмент успеет истечь до рендера,
+блок загрузится синхронно, а не закэшируется пустым. Шаблон рендерится в потоке (sync_to_async): {% cache %} и
+контекст-процессоры синхронные.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.shortcuts import aget_object_or_404, render
+from django.utils.functional import SimpleLazyObject
+
+from . import dashboard
+from .alerts import current_alerts
+from .decorators import aget_roles
+from .models import Fabric, Product, ProductProductionStats, ProductTransaction, WorkerProductLog
+from .pagination import aledger_page
+from .views import (
+    _dashboard_fabrics, _dashboard_products, _period_start, _totals_aggregates, _warehouse_totals,
+)
+
+# блок дашборда → имя фрагмента {% cache %} в шаблоне роли
+SUPERUSER_FRAGMENTS = {'users': 'superuser_users', 'fabrics': 'superuser_fabrics', 'products': 'superuser_products'}
+ADMIN_FRAGMENTS = {'users': 'admin_workers', 'fabrics': 'admin_fabrics', 'products': 'admin_products'}
+
+arender = sync_to_async(render)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _auser(request):
+    user = await request.auser()
+    request.user = user  # чтобы контекст-процессоры при рендере не загружали пользователя заново
+    return user
+
+
+async def _missing_sections(fragments, versions):
+    """Блоки, фрагментов которых для текущих версий нет в кэше."""
+    keys = {section: make_template_fragment_key(name, [versions[section]]) for section, name in fragments.items()}
+    cached = await cache.aget_many(list(keys.values()))
+    return {section for section, key in keys.items() if key not in cached}
+
+
+async def _catalog_section(queryset, model, price_field):
+    return await asyncio.gather(_alist(queryset), model.objects.aaggregate(**_totals_aggregates(price_field)))
+
+
+async def _dashboard_context(fragments, users):
+    """
+    Общая часть дашбордов суперпользователя и админа: каталоги, итоги, алерты, версии.
+    users — ленивые querysets блока пользователей (один или кортеж). Блоки без фрагмента
+    в кэше загружаются асинхронно; остальные остаются ленивыми и выполнятся при рендере
+    (в потоке sync_to_async), только если фрагмент к тому времени пропал из кэша.
+    """
+    versions, stock_alerts = await asyncio.gather(
+        dashboard.asection_versions(), sync_to_async(current_alerts)(),
+    )
+    missing = await _missing_sections(fragments, versions)
+
+    fabrics, products = _dashboard_fabrics(), _dashboard_products()
+    context = {
+        'fabrics': fabrics,
+        'products': products,
+        'totals': {
+            'fabrics': SimpleLazyObject(lambda: _warehouse_totals(Fabric, 'price')),
+            'products': SimpleLazyObject(lambda: _warehouse_totals(Product, 'price_per_unit')),
+        },
+        'users': users,
+        'stock_alerts': stock_alerts,
+        'versions': versions,
+        'fragment_timeout': dashboard.FRAGMENT_TIMEOUT,
+    }
+    loaders = {
+        'users': lambda: (
+            asyncio.gather(*map(_alist, users)) if isinstance(users, tuple) else _alist(users)
+        ),
+        'fabrics': lambda: _catalog_section(fabrics, Fabric, 'price'),
+        'products': lambda: _catalog_section(products, Product, 'price_per_unit'),
+    }
+    sections = [section for section in loaders if section in missing]
+    loaded = dict(zip(sections, await asyncio.gather(*(loaders[section]() for section in sections))))
+
+    if 'users' in loaded:
+        context['users'] = loaded['users']
+    for section in ('fabrics', 'products'):
+        if section in loaded:
+            context[section], context['totals'][section] = loaded[section]
+    return context
+
+
+@login_required
+async def role_based_home(request):
+    user = await _auser(request)
+    roles = await aget_roles(user)
+
+    # ===== SUPERUSER =====
+    if user.is_superuser:
+        context = await _dashboard_context(SUPERUSER_FRAGMENTS, (
+            User.objects.filter(groups__name='admin')[:3],
+            User.objects.filter(groups__name='worker')[:3],
+            User.objects.filter(groups__isnull=True)[:3],
+        ))
+        admins, workers, no_role_users = context.pop('users')
+        context.update({
+            'admins': admins,
+            'workers': workers,
+            'no_rule_users': no_role_users,
+            'title': f'Superuser page {user.username}',
+        })
+        return await arender(request, 'main/for_superuser.html', context)
+
+    # ===== ADMIN =====
+    elif 'admin' in roles:
+        context = await _dashboard_context(ADMIN_FRAGMENTS, User.objects.filter(groups__name='worker'))
+        context.update({'title': f'{user.username} page', 'workers': context.pop('users')})
+        return await arender(request, 'main/for_admins.html', context)
+
+    # ===== WORKER =====
+    elif 'worker' in roles:
+        logs = WorkerProductLog.objects.filter(worker=user).select_related('product')
+        period = request.GET.get('period', 'all')
+        start_date = _period_start(period)
+        if start_date:
+            logs = logs.filter(date__gte=start_date)
+
+        return await arender(request, 'main/for_workers.html', {
+            'recent_logs': await _alist(logs.order_by('-date')),
+            'user': user,
+            'selected_period': period,
+        })
+
+    # ===== NO ROLE =====
+    else:
+        return await arender(request, 'main/no_role.html')
+
+
+@login_required
+async def view_product(request, pk):
+    user = await _auser(request)
+    product = await aget_object_or_404(Product, pk=pk)
+
+    stats, recent_logs, roles = await asyncio.gather(
+        ProductProductionStats.objects.filter(product=product).afirst(),
+        _alist(WorkerProductLog.objects.filter(product=product).select_related('worker').order_by('-date')[:10]),
+        aget_roles(user),
+    )
+    total_produced = stats.total_qty if stats else 0
+    current_qty = product.quantity or 0
+
+    return await arender(request, 'product/view_product.html', {
+        'product': product,
+        'total_qty': total_produced,
+        'current_qty': current_qty,
+        'stock_value': current_qty * (product.price_per_unit or 0),
+        'last_date': stats.last_date if stats else None,
+        'recent_logs': recent_logs,
+        'can_manage': user.is_superuser or 'admin' in roles,
+    })
+
+
+async def _history(request, item, queryset, template, name, production=None):
+    transactions, next_cursor = await aledger_page(
+        queryset.select_related('user'),
+        item.quantity,
+        cursor=request.GET.get('cursor'),
+        before=request.GET.get('before'),
+        production=production,
+    )
+    return await arender(request, template, {
+        name: item,
+        'transactions': transactions,
+        'next_cursor': next_cursor,
+        'before': request.GET.get('before', ''),
+    })
+
+
+@login_required
+async def materials_history(request, pk):
+    await _auser(request)
+    fabric = await aget_object_or_404(Fabric, pk=pk)
+    return await _history(request, fabric, fabric.transactions.all(), 'materials/materials_history.html', 'fabric')
+
+
+@login_required
+async def products_history(request, pk):
+    await _auser(request)
+    product = await aget_object_or_404(Product, pk=pk)
+    return await _history(
+        request, product, ProductTransaction.objects.filter(product=product),
+        'product/product_history.html', 'product', production=WorkerProductLog.objects.filter(product=product),
+    )
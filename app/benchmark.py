@@ -0,0 +1,172 @@
+"""
+Замеры основных view через тестовый клиент: задержка (первый и повторные запросы),
+число SQL и пиковая память на запрос. Запускается командой run_benchmarks на
+отдельной тестовой базе, заполненной app.synthetic.
+"""
+import importlib
+import math
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import clear_url_caches, reverse
+
+from . import synthetic
+from .models import Fabric, Product
+
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}}
+
+
+@dataclass
+class Scenario:
+    name: str
+    user: str                                   # ключ в контексте: 'superuser', 'admin', 'worker'
+    url: Callable[[dict], str]
+    data: Optional[Callable[[dict], dict]] = None  # есть данные — значит POST
+
+
+SCENARIOS = [
+    Scenario('home_superuser', 'superuser', lambda ctx: reverse('home')),
+    Scenario('home_admin', 'admin', lambda ctx: reverse('home')),
+    Scenario('home_worker', 'worker', lambda ctx: reverse('home')),
+    Scenario('view_product', 'admin', lambda ctx: reverse('view_product', args=[ctx['product']])),
+    Scenario('materials_history', 'admin', lambda ctx: reverse('materials_history', args=[ctx['fabric']])),
+    Scenario('product_history', 'admin', lambda ctx: reverse('product_history', args=[ctx['product']])),
+    Scenario('view_user', 'admin', lambda ctx: reverse('view_user', args=[ctx['worker_id']])),
+    Scenario('productivity_report', 'admin', lambda ctx: reverse('productivity_report')),
+    Scenario('products_out', 'admin', lambda ctx: reverse('product_out', args=[ctx['product']]),
+             lambda ctx: {'value': '1', 'note': 'bench'}),
+    Scenario('products_in', 'admin', lambda ctx: reverse('product_in', args=[ctx['product']]),
+             lambda ctx: {'value': '1', 'note': 'bench'}),
+    Scenario('add_worker_product', 'admin', lambda ctx: reverse('add_worker_product'),
+             lambda ctx: {'worker': ctx['worker'], 'product': ctx['product'], 'quantity': '1'}),
+]
+
+
+def _context(info):
+    """Кого и что запрашивать: самый «тяжёлый» работник, ткань с самой длинной историей и т.п."""
+    worker_id, worker = (
+        User.objects.filter(groups__name='worker', username__startswith=info['admin'].rsplit('-', 1)[0])
+        .annotate(n=Count('workerproductlog')).order_by('-n').values_list('pk', 'username').first()
+    )
+    fabric = Fabric.objects.annotate(n=Count('transactions')).order_by('-n').values_list('pk', flat=True).first()
+    # продукт с наибольшим остатком и историей производства: хватит на все отгрузки замера
+    product = (
+        Product.objects.filter(production_stats__isnull=False).order_by('-quantity').values_list('pk', flat=True).first()
+    )
+    return {
+        'superuser': info['superuser'], 'admin': info['admin'], 'worker': worker, 'worker_id': worker_id,
+        'fabric': fabric, 'product': product,
+    }
+
+
+@contextmanager
+def scratch_database(on_disk=False):
+    """
+    Одноразовая тестовая база (как у manage.py test) и кэш в памяти процесса:
+    замеры не трогают рабочие данные и не зависят от прогретого файлового кэша.
+    on_disk — для SQLite файл вместо общей базы в памяти (нужно параллельным замерам:
+    у базы в памяти блокировки таблиц без ожидания, у файла — WAL и busy_timeout).
+    """
+    setup_test_environment()
+    if on_disk and connection.vendor == 'sqlite' and not connection.settings_dict['TEST']['NAME']:
+        connection.settings_dict['TEST']['NAME'] = str(Path(tempfile.gettempdir()) / 'bench-scratch.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(CACHES=BENCH_CACHES, REQUEST_PROFILING=False):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def use_async_views(enabled):
+    """Пересобрать URLconf с нужными view: app/urls.py выбирает их по settings.ASYNC_VIEWS при импорте."""
+    from . import urls
+    with override_settings(ASYNC_VIEWS=enabled):
+        importlib.reload(urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))  # include() держит старые patterns
+    clear_url_caches()
+
+
+def fill(counts, seed=0, prefix='bench'):
+    """Очистить базу и заполнить данными масштаба counts; возвращает контекст сценариев."""
+    call_command('flush', interactive=False, verbosity=0)
+    info = synthetic.generate(**counts, seed=seed, prefix=prefix)
+    return _context(info)
+
+
+def login(scenario, ctx):
+    client = Client()
+    client.force_login(User.objects.get(username=ctx[scenario.user]))
+    return client
+
+
+def request(client, scenario, ctx):
+    url = scenario.url(ctx)
+    if scenario.data:
+        return client.post(url, scenario.data(ctx))
+    return client.get(url)
+
+
+def measure(scenario, ctx, iterations):
+    client = login(scenario, ctx)
+
+    # журнал запросов — deque ограниченной длины: заполненный после генерации данных, он «не растёт»
+    reset_queries()
+    start = time.perf_counter()
+    with CaptureQueriesContext(connection) as cold_queries:
+        response = request(client, scenario, ctx)
+    cold = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        request(client, scenario, ctx)
+        latencies.append(time.perf_counter() - start)
+
+    reset_queries()
+    with CaptureQueriesContext(connection) as warm_queries:
+        tracemalloc.start()
+        try:
+            request(client, scenario, ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'status': response.status_code,
+        'cold_ms': round(cold * 1000, 2),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p95_ms': round(latencies[math.ceil(0.95 * len(latencies)) - 1] * 1000, 2) if latencies else None,
+        'queries_cold': len(cold_queries),
+        'queries': len(warm_queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(counts, iterations=20, seed=0, prefix='bench', log=None):
+    """Заполнить текущую (одноразовую!) базу данными масштаба counts и замерить все сценарии."""
+    start = time.perf_counter()
+    ctx = fill(counts, seed=seed, prefix=prefix)
+    result = {'data': counts, 'generate_s': round(time.perf_counter() - start, 2), 'scenarios': {}}
+    for scenario in SCENARIOS:
+        result['scenarios'][scenario.name] = measure(scenario, ctx, iterations)
+        if log:
+            log(scenario.name, result['scenarios'][scenario.name])
+    return result
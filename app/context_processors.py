@@ -0,0 +1,13 @@
+from .decorators import get_roles
+
+
+def user_roles(request):
+    """Роли текущего пользователя для шаблонов: {% if is_admin %}, {% if 'worker' in user_roles %}."""
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+    roles = get_roles(user)
+    return {
+        'user_roles': roles,
+        'is_admin': user.is_superuser or 'admin' in roles,
+    }
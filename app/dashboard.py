@@ -0,0 +1,48 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Блоки дашборда, которые кэшируются фрагментами ({% cache %} в for_superuser/for_admins)
+SECTIONS = ('fabrics', 'products', 'users')
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'dashboard:{}:version'
+
+
+def _new_version():
+    # уникальный токен, а не счётчик: incr у файлового кэша — это get + set, и при гонке
+    # двух сбросов один терялся бы; новая уникальная запись меняет версию при любой гонке
+    return uuid.uuid4().hex
+
+
+def section_versions():
+    """Текущие версии всех блоков одним обращением к кэшу: {'fabrics': '9f1c…', ...}."""
+    keys = {VERSION_KEY.format(name): name for name in SECTIONS}
+    found = cache.get_many(list(keys))
+    # новая версия и после вытеснения ключа — чтобы не совпасть с пережившими его фрагментами
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: value for key, value in found.items()}
+
+
+async def asection_versions():
+    """section_versions() для async view."""
+    keys = {VERSION_KEY.format(name): name for name in SECTIONS}
+    found = await cache.aget_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, None)
+        found.update(missing)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def bump(*sections):
+    """
+    Сделать закэшированные фрагменты блоков устаревшими (после коммита транзакции,
+    чтобы следующий запрос не закэшировал незакоммиченное состояние).
+    """
+    def _bump():
+        cache.set_many({VERSION_KEY.format(name): _new_version() for name in sections}, None)
+    transaction.on_commit(_bump)
@@ -1,4 +1,57 @@
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
+from django.core.cache import cache
+
+ROLE_CACHE_KEY = 'user-roles:{}'
+
+
+def get_roles(user):
+    """
+    Набор имён групп пользователя. Запрашивается из БД один раз на запрос
+    (кэшируется на объекте user), а при ROLE_CACHE_TIMEOUT > 0 — ещё и в кэше Django.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_roles_cache', None)
+    if roles is None:
+        timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+        key = ROLE_CACHE_KEY.format(user.pk)
+        roles = cache.get(key) if timeout else None
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            if timeout:
+                cache.set(key, roles, timeout)
+        user._roles_cache = roles
+    return roles
+
+
+async def aget_roles(user):
+    """get_roles() для async view: тот же кэш на объекте user и в кэше Django."""
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_roles_cache', None)
+    if roles is None:
+        timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+        key = ROLE_CACHE_KEY.format(user.pk)
+        roles = await cache.aget(key) if timeout else None
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            if timeout:
+                await cache.aset(key, roles, timeout)
+        user._roles_cache = roles
+    return roles
+
+
+def forget_roles(*user_ids):
+    """Сбросить закэшированные роли (после изменения групп пользователя)."""
+    cache.delete_many([ROLE_CACHE_KEY.format(pk) for pk in user_ids])
+
+
+def has_role(user, name):
+    return name in get_roles(user)
+
 
 def is_admin_or_superuser(user):
-    return user.is_superuser or user.groups.filter(name='admin').exists()
+    return user.is_superuser or has_role(user, 'admin')
@@ -0,0 +1,177 @@
+"""
+Потоковая выгрузка журналов движений (MaterialTransaction / ProductTransaction) в CSV и XLSX.
+
+Строки читаются .iterator(chunk_size=...) с select_related — один запрос на пачку,
+а файл отдаётся кусками по мере чтения, так что память не растёт с размером журнала.
+"""
+import csv
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils.timezone import localtime, make_aware
+
+from .models import MaterialTransaction, ProductTransaction
+
+CHUNK_SIZE = 2000
+COLUMNS = ('id', 'created_at', 'item_id', 'item', 'type', 'amount', 'user', 'note')
+
+LEDGERS = {
+    # вид журнала → (модель, FK на позицию склада)
+    'materials': (MaterialTransaction, 'fabric'),
+    'products': (ProductTransaction, 'product'),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _day_start(value):
+    return make_aware(datetime.combine(value, time.min))
+
+
+def ledger_queryset(kind, date_from=None, date_to=None, item=None, transaction_type=None):
+    """Журнал вида kind с фильтрами по датам (включительно), позиции и типу, в хронологическом порядке."""
+    model, item_field = LEDGERS[kind]
+    qs = model.objects.select_related('user', item_field).only(
+        'id', 'created_at', 'transaction_type', 'amount', 'note',
+        'user__username', f'{item_field}__name',
+    )
+    if date_from:
+        qs = qs.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        qs = qs.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+    if item:
+        qs = qs.filter(**{f'{item_field}_id': item})
+    if transaction_type:
+        qs = qs.filter(transaction_type=transaction_type)
+    return qs.order_by('created_at', 'id')
+
+
+def rows(queryset, kind, chunk_size=CHUNK_SIZE):
+    """Строки выгрузки кортежами в порядке COLUMNS."""
+    _, item_field = LEDGERS[kind]
+    for tx in queryset.iterator(chunk_size=chunk_size):
+        item = getattr(tx, item_field)
+        yield (
+            tx.pk,
+            localtime(tx.created_at).replace(tzinfo=None, microsecond=0),
+            item.pk,
+            item.name,
+            tx.transaction_type,
+            tx.amount,
+            tx.user.username if tx.user else '',
+            tx.note or '',
+        )
+
+
+class _Buffer:
+    """Файлоподобный приёмник: копит записанное, stream() отдаёт и очищает накопленное."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data if isinstance(data, bytes) else data.encode())
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def stream(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=' ', timespec='seconds')
+    elif isinstance(value, date):
+        value = value.isoformat()
+    if isinstance(value, (int, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def stream_csv(row_iter):
+    """CSV по кускам (байты, UTF-8 с BOM для Excel)."""
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(COLUMNS)
+    for index, row in enumerate(row_iter, 1):
+        writer.writerow(row)
+        if index % CHUNK_SIZE == 0:
+            yield buffer.stream()
+    yield buffer.stream()
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="ledger" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def stream_xlsx(row_iter):
+    """
+    XLSX по кускам без openpyxl: минимальная книга из одного листа, строки — inline-строки.
+    zipfile пишет в непозиционируемый буфер (с дескрипторами данных), поэтому архив
+    не нужно держать целиком в памяти.
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.stream()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(('<row>%s</row>' % ''.join(_cell(c) for c in COLUMNS)).encode())
+            for index, row in enumerate(row_iter, 1):
+                sheet.write(('<row>%s</row>' % ''.join(_cell(value) for value in row)).encode())
+                if index % CHUNK_SIZE == 0:
+                    yield buffer.stream()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.stream()
+
+
+def export(kind, fmt, **filters):
+    """Итератор байтов выгрузки журнала kind в формате fmt ('csv' или 'xlsx')."""
+    row_iter = rows(ledger_queryset(kind, **filters), kind)
+    return stream_xlsx(row_iter) if fmt == 'xlsx' else stream_csv(row_iter)
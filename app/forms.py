@@ -1,6 +1,7 @@
 from django import  forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from . import tasks
 from .models import Fabric, MaterialTransaction, Product
 
 class RegisterForm(UserCreationForm):
@@ -12,10 +13,31 @@ class RegisterForm(UserCreationForm):
 
 
 
-class FabricForm(forms.ModelForm):
+class ReorderPointMixin:
+    """Точка заказа необязательна в формах: пустое значение — 0 (не следить)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['reorder_point'].required = False
+
+    def clean_reorder_point(self):
+        return self.cleaned_data.get('reorder_point') or 0
+
+
+class ImageRenditionsMixin:
+    """После сохранения с новым изображением ставит в очередь нарезку его уменьшенных копий."""
+
+    def save(self, commit=True):
+        instance = super().save(commit=commit)
+        if commit and 'image' in self.changed_data and instance.image:
+            tasks.build_image_renditions.delay(instance._meta.label_lower, instance.pk)
+        return instance
+
+
+class FabricForm(ReorderPointMixin, ImageRenditionsMixin, forms.ModelForm):
     class Meta:
         model = Fabric
-        fields = ['name', 'quantity', 'price', 'unit', 'image']
+        fields = ['name', 'quantity', 'price', 'unit', 'reorder_point', 'image']
 
 
 class MaterialTransactionForm(forms.ModelForm):
@@ -27,10 +49,50 @@ class MaterialTransactionForm(forms.ModelForm):
         }
 
 
-class ProductForm(forms.ModelForm):
+class ProductForm(ReorderPointMixin, ImageRenditionsMixin, forms.ModelForm):
     class Meta:
         model = Product
-        fields = ['name', 'price_per_unit', 'image', 'is_active']
-        
-        
+        fields = ['name', 'price_per_unit', 'product_type', 'reorder_point', 'image', 'is_active']
+
+
+class WorkerProductLogRowForm(forms.Form):
+    """Одна строка пакетного ввода производства: работник, продукт, количество."""
+    worker = forms.ModelChoiceField(
+        queryset=User.objects.filter(groups__name='worker').order_by('username'),
+        to_field_name='username',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    product = forms.ModelChoiceField(
+        queryset=Product.objects.filter(is_active=True).order_by('name'),
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    quantity = forms.IntegerField(
+        min_value=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'min': 1}),
+    )
+
+
+class BaseWorkerProductLogFormSet(forms.BaseFormSet):
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+        if not any(form.cleaned_data for form in self.forms if not self._should_delete_form(form)):
+            raise forms.ValidationError("Заполните хотя бы одну строку.")
+
+    def entries(self):
+        """(worker, product, quantity) для всех заполненных строк."""
+        return [
+            (form.cleaned_data['worker'], form.cleaned_data['product'], form.cleaned_data['quantity'])
+            for form in self.forms
+            if form.cleaned_data
+        ]
+
 
+WorkerProductLogFormSet = forms.formset_factory(
+    WorkerProductLogRowForm,
+    formset=BaseWorkerProductLogFormSet,
+    extra=10,
+    max_num=200,
+    validate_max=True,
+)
@@ -0,0 +1,88 @@
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+RENDITION_ROOT = 'renditions'
+
+# Имя → (ширина, высота) для 1x; 2x генерируется автоматически для srcset
+RENDITIONS = {
+    'thumb': (40, 40),      # иконка в таблице продуктов
+    'card': (400, 200),     # карточки на дашборде
+    'detail': (900, 300),   # страницы ткани/продукта
+}
+DENSITIES = (1, 2)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def rendition_name(source_name, rendition, density, ext):
+    """media/fabrics/kok_mato.jpeg → renditions/fabrics/kok_mato_card_2x.webp"""
+    folder, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(RENDITION_ROOT, folder, f"{stem}_{rendition}_{density}x.{ext}")
+
+
+def build_renditions(image_field, force=False):
+    """
+    Нарезать все уменьшенные копии (WebP + JPEG, 1x/2x) для ImageField и сохранить в MEDIA.
+    Уже существующие файлы пропускаются, если не force. Возвращает число созданных файлов.
+    """
+    if not image_field:
+        return 0
+
+    targets = [
+        (name, density, ext)
+        for name in RENDITIONS
+        for density in DENSITIES
+        for ext in FORMATS
+    ]
+    if not force:
+        targets = [t for t in targets if not default_storage.exists(rendition_name(image_field.name, *t))]
+    if not targets:
+        return 0
+
+    with image_field.storage.open(image_field.name, 'rb') as fh:
+        source = ImageOps.exif_transpose(Image.open(fh))
+        source.load()
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+
+    created = 0
+    for name, density, ext in targets:
+        width, height = RENDITIONS[name]
+        size = (width * density, height * density)
+        fitted = ImageOps.fit(source, size, Image.Resampling.LANCZOS)
+        pil_format, options = FORMATS[ext]
+        if pil_format == 'JPEG' and fitted.mode != 'RGB':
+            fitted = fitted.convert('RGB')
+
+        buffer = BytesIO()
+        fitted.save(buffer, pil_format, **options)
+        path = rendition_name(image_field.name, name, density, ext)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, ContentFile(buffer.getvalue()))
+        created += 1
+    return created
+
+
+def mark_renditions(obj):
+    """Отметить, что копии текущего изображения объекта нарезаны; если его успели заменить — не отмечать."""
+    type(obj).objects.filter(pk=obj.pk, image=obj.image.name).update(image_renditions=obj.image.name)
+
+
+def renditions_ready(image_field):
+    """Есть ли копии для этого файла — по отметке в строке объекта, без обращения к хранилищу."""
+    return getattr(image_field.instance, 'image_renditions', '') == image_field.name
+
+
+def rendition_srcset(image_field, rendition, ext):
+    return ', '.join(
+        f"{default_storage.url(rendition_name(image_field.name, rendition, density, ext))} {density}x"
+        for density in DENSITIES
+    )
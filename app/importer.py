@@ -0,0 +1,281 @@
+"""
+Массовый импорт тканей и продуктов из CSV/XLSX с начальными остатками.
+
+Каждая строка проверяется правилами FabricForm/ProductForm (без запроса на
+уникальность — имя и есть ключ upsert). Если есть ошибки, ничего не пишется и
+возвращается список (номер строки, сообщение). Иначе в одной транзакции:
+  * позиции вставляются/обновляются по имени пачками bulk_create(update_conflicts=True);
+  * у новых позиций начальный остаток проводится приходом (IN) — тоже пачками.
+У уже существующих позиций остаток не трогается: повторный импорт файла
+не удваивает склад.
+"""
+import csv
+import io
+import re
+import zipfile
+from dataclasses import dataclass, field
+from decimal import Decimal
+from xml.etree.ElementTree import ParseError, iterparse
+
+from django import forms
+from django.db import transaction
+
+from . import alerts, dashboard, reports
+from .forms import FabricForm, ProductForm
+from .models import Fabric, MaterialTransaction, Product, ProductTransaction, ProductType
+from .planning import invalidate_matrix
+
+BATCH_SIZE = 1000
+OPENING_NOTE = "Начальный остаток (импорт)"
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_FALSE = {'0', 'false', 'no', 'n', 'нет', "yo'q"}
+
+
+class ImportFileError(ValueError):
+    """Файл не читается как CSV в UTF-8 или как книга XLSX."""
+
+
+@dataclass
+class ImportResult:
+    kind: str
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    opening_balances: int = 0
+    errors: list = field(default_factory=list)  # [(номер строки, сообщение)]
+    dry_run: bool = False
+
+
+# --- Чтение файлов ----------------------------------------------------------
+
+def read_csv(stream):
+    """(номер строки, {колонка: значение}) из текстового потока CSV; первая строка — заголовок."""
+    reader = csv.DictReader(stream)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def _column(ref):
+    letters = re.match(r'[A-Z]+', ref).group()
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def read_xlsx(fileobj):
+    """
+    То же для первого листа XLSX — без openpyxl: лист читается iterparse построчно,
+    в памяти только таблица общих строк.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        names = archive.namelist()
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as fh:
+                for _, elem in iterparse(fh):
+                    if elem.tag == _NS + 'si':
+                        shared.append(''.join(t.text or '' for t in elem.iter(_NS + 't')))
+                        elem.clear()
+        sheet = min(name for name in names if name.startswith('xl/worksheets/sheet'))
+
+        header = None
+        with archive.open(sheet) as fh:
+            for _, elem in iterparse(fh):
+                if elem.tag != _NS + 'row':
+                    continue
+                values = {}
+                for cell in elem.iter(_NS + 'c'):
+                    kind = cell.get('t')
+                    if kind == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(_NS + 't'))
+                    else:
+                        v = cell.find(_NS + 'v')
+                        value = v.text if v is not None and v.text else ''
+                        if kind == 's' and value:
+                            value = shared[int(value)]
+                    values[_column(cell.get('r'))] = value.strip()
+                line = int(elem.get('r'))
+                elem.clear()
+                if header is None:
+                    header = {index: name.lower() for index, name in values.items()}
+                    continue
+                if any(values.values()):
+                    yield line, {name: values.get(index, '') for index, name in header.items()}
+
+
+def read_file(fileobj, filename):
+    """
+    Строки файла по расширению: .xlsx — как книга, иначе CSV в UTF-8 (BOM допускается).
+    Файл читается лениво; нечитаемый (другая кодировка, битый архив) — ImportFileError.
+    """
+    if filename.lower().endswith('.xlsx'):
+        return _guard(read_xlsx(fileobj), "Файл не похож на книгу XLSX")
+    return _guard(
+        read_csv(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')),
+        "Файл не читается как CSV в UTF-8 (в Excel сохраните как «CSV UTF-8»)",
+    )
+
+
+def _guard(rows, message):
+    try:
+        yield from rows
+    except (UnicodeDecodeError, csv.Error, zipfile.BadZipFile, ParseError, KeyError, IndexError, ValueError) as exc:
+        raise ImportFileError(f"{message}: {exc}") from exc
+
+
+# --- Проверка строк ---------------------------------------------------------
+
+class _ImportFormMixin:
+    """Уникальность имени не проверяем: существующее имя — это обновление, а не ошибка."""
+
+    def validate_unique(self):
+        pass
+
+
+class FabricImportForm(_ImportFormMixin, FabricForm):
+    class Meta(FabricForm.Meta):
+        fields = ['name', 'quantity', 'price', 'unit', 'reorder_point']
+
+
+class ProductImportForm(_ImportFormMixin, ProductForm):
+    opening_quantity = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+
+    class Meta(ProductForm.Meta):
+        fields = ['name', 'price_per_unit', 'reorder_point', 'is_active']
+
+    def __init__(self, *args, product_types=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # тип продукта — по имени из заранее загруженного словаря, без запроса на каждую строку
+        self.fields['product_type'] = forms.TypedChoiceField(
+            choices=[('', '')] + [(name, name) for name in product_types],
+            coerce=product_types.get, required=False, empty_value=None,
+        )
+
+
+def _fabric_data(row):
+    return {
+        'name': row.get('name', ''),
+        'quantity': row.get('quantity') or '0',
+        'price': row.get('price') or '0',
+        'unit': row.get('unit') or 'kg',
+        'reorder_point': row.get('reorder_point', ''),
+    }
+
+
+def _product_data(row):
+    return {
+        'name': row.get('name', ''),
+        'price_per_unit': row.get('price_per_unit') or row.get('price') or '0',
+        'product_type': row.get('product_type', ''),
+        'reorder_point': row.get('reorder_point', ''),
+        'is_active': (row.get('is_active') or 'true').lower() not in _FALSE,
+        'opening_quantity': row.get('quantity', ''),
+    }
+
+
+def _form_message(form):
+    return "; ".join(
+        f"{name}: {' '.join(messages)}" if name != '__all__' else ' '.join(messages)
+        for name, messages in form.errors.items()
+    )
+
+
+def validate(kind, rows):
+    """
+    Проверить строки: ([(line, объект, начальный остаток)], [(line, ошибка)]).
+    Объекты — несохранённые экземпляры модели, собранные формой.
+    """
+    valid, errors, seen = [], [], {}
+    product_types = {}
+    if kind == 'products':
+        for pk, name in ProductType.objects.order_by('-pk').values_list('pk', 'name'):
+            product_types[name] = ProductType(pk=pk, name=name)  # при одинаковых именах — первый
+
+    for line, row in rows:
+        if kind == 'fabrics':
+            form = FabricImportForm(_fabric_data(row))
+        else:
+            form = ProductImportForm(_product_data(row), product_types=product_types)
+        if not form.is_valid():
+            errors.append((line, _form_message(form)))
+            continue
+        name = form.cleaned_data['name']
+        if name in seen:
+            errors.append((line, f"name: «{name}» уже встречается в строке {seen[name]}."))
+            continue
+        seen[name] = line
+        if kind == 'fabrics':
+            opening = form.cleaned_data['quantity']
+        else:
+            form.instance.product_type = form.cleaned_data['product_type']
+            opening = form.cleaned_data.get('opening_quantity') or Decimal('0')
+        if opening < 0:
+            errors.append((line, "quantity: начальный остаток не может быть отрицательным."))
+            continue
+        valid.append((line, form.instance, opening))
+    return valid, errors
+
+
+# --- Запись -----------------------------------------------------------------
+
+IMPORTS = {
+    # вид → (модель, модель журнала, FK журнала, обновляемые при конфликте поля)
+    'fabrics': (Fabric, MaterialTransaction, 'fabric', ['price', 'unit', 'reorder_point']),
+    'products': (Product, ProductTransaction, 'product', ['price_per_unit', 'product_type', 'reorder_point', 'is_active']),
+}
+
+
+def _ids_by_name(model, names):
+    """{name: pk} для существующих позиций — пачками, чтобы не упереться в лимит параметров SQL."""
+    ids = {}
+    for start in range(0, len(names), BATCH_SIZE):
+        ids.update(model.objects.filter(name__in=names[start:start + BATCH_SIZE]).values_list('name', 'pk'))
+    return ids
+
+
+def import_rows(kind, rows, dry_run=False, user=None):
+    """Импортировать строки вида kind ('fabrics' / 'products'); при любой ошибке ничего не пишется."""
+    model, ledger, fk, update_fields = IMPORTS[kind]
+    valid, errors = validate(kind, rows)
+    result = ImportResult(kind=kind, rows=len(valid) + len(errors), errors=errors, dry_run=dry_run)
+
+    existing = _ids_by_name(model, [obj.name for _, obj, _ in valid])
+    new = {obj.name: opening for _, obj, opening in valid if obj.name not in existing}
+    result.created = len(new)
+    result.updated = len(valid) - len(new)
+    result.opening_balances = sum(1 for opening in new.values() if opening > 0)
+    if errors or dry_run or not valid:
+        return result
+
+    with transaction.atomic():
+        objs = []
+        for _, obj, opening in valid:
+            obj.quantity = opening if obj.name in new else Decimal('0')  # количество при конфликте не обновляется
+            objs.append(obj)
+        model.objects.bulk_create(
+            objs, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=['name'], update_fields=update_fields,
+        )
+
+        names = [name for name, opening in new.items() if opening > 0]
+        ids = _ids_by_name(model, names)
+        ledger.objects.bulk_create(
+            [
+                ledger(**{f'{fk}_id': ids[name]}, user=user, transaction_type=ledger.IN,
+                       amount=new[name], note=OPENING_NOTE)
+                for name in names
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        # bulk_create обходит сигналы — сбрасываем то, что они бы сбросили
+        dashboard.bump(kind)
+        if kind == 'products':
+            invalidate_matrix()
+            reports.invalidate()
+        transaction.on_commit(alerts.sweep)
+    return result
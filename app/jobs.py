@@ -0,0 +1,189 @@
+"""
+Очередь фоновых задач в базе данных (модель Job) — без Redis и внешнего брокера.
+
+    @jobs.task(priority=5)
+    def build_image_renditions(model, pk): ...
+
+    build_image_renditions.delay('fabric', fabric.pk)
+
+Задача пишется в таблицу в текущей транзакции (откатилась транзакция — пропала и
+задача), а выполняет её команда run_worker в пуле процессов. Воркер берёт задачу
+условным UPDATE ... WHERE status = 'queued', как shift_quantity двигает остатки, —
+два воркера одну задачу не возьмут. Упавшая задача повторяется с задержкой
+retry_delay · 2^(попытка−1), пока не исчерпает max_attempts. Пока задача выполняется,
+отдельный поток раз в HEARTBEAT_EVERY отмечает heartbeat_at: брошенной считается
+задача без отметки дольше STALE_AFTER, а не просто долгая.
+
+JOBS_EAGER=1 — выполнять задачи сразу после коммита в том же процессе
+(разработка и CI без запущенного воркера).
+"""
+import functools
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger('app.jobs')
+
+CLAIM_BATCH = 10        # кандидатов за один запрос; остальные — при следующем опросе
+HEARTBEAT_EVERY = 30     # секунд между отметками heartbeat_at выполняющейся задачи
+STALE_AFTER = timedelta(minutes=5)
+
+TASKS = {}
+
+
+class Task:
+    """Функция, которую можно поставить в очередь: task.delay(*args, **kwargs)."""
+
+    def __init__(self, func, priority, max_attempts, retry_delay):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return enqueue(self, args, kwargs)
+
+
+def task(priority=0, max_attempts=3, retry_delay=30):
+    """Зарегистрировать функцию как фоновую задачу. Аргументы и результат — JSON."""
+    def decorator(func):
+        registered = Task(func, priority, max_attempts, retry_delay)
+        TASKS[registered.name] = registered
+        return registered
+    return decorator
+
+
+def enqueue(task, args=(), kwargs=None, priority=None, user=None):
+    """Поставить задачу в очередь; возвращает Job."""
+    job = Job.objects.create(
+        name=task.name,
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=task.priority if priority is None else priority,
+        max_attempts=task.max_attempts,
+        retry_delay=task.retry_delay,
+        user=user if user is not None and user.is_authenticated else None,
+    )
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(partial(run, job.pk, 'eager'))
+    return job
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _start(queryset, worker):
+    now = timezone.now()
+    return queryset.filter(status=Job.QUEUED).update(
+        status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+    )
+
+
+class Heartbeat(threading.Thread):
+    """Отмечать heartbeat_at задачи, пока она выполняется, — чтобы requeue_stale не взял её второй раз."""
+
+    def __init__(self, pk, every=HEARTBEAT_EVERY):
+        super().__init__(name=f'job-{pk}-heartbeat', daemon=True)
+        self.pk = pk
+        self.every = every
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.every):
+                try:
+                    Job.objects.filter(pk=self.pk, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+                except DatabaseError:  # база занята записью самой задачи — отметимся в следующий раз
+                    logger.warning("Задача #%s: не удалось отметить heartbeat", self.pk, exc_info=True)
+        finally:
+            connection.close()  # у потока своё соединение
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def claim(worker):
+    """Взять следующую готовую задачу (по приоритету, затем по времени): pk или None."""
+    ready = (
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now())
+        .order_by('-priority', 'run_at', 'pk')
+        .values_list('pk', flat=True)
+    )
+    for pk in ready[:CLAIM_BATCH]:
+        if _start(Job.objects.filter(pk=pk), worker):
+            return pk
+    return None
+
+
+def run(pk, worker):
+    """Взять конкретную задачу и выполнить (режим JOBS_EAGER)."""
+    if _start(Job.objects.filter(pk=pk), worker):
+        return execute(pk)
+    return None
+
+
+def execute(pk):
+    """Выполнить взятую задачу и записать итог; возвращает новый статус."""
+    close_old_connections()
+    job = Job.objects.get(pk=pk)
+    heartbeat = Heartbeat(pk)
+    heartbeat.start()
+    try:
+        task = TASKS.get(job.name) or import_string(job.name)  # модуль задачи мог быть ещё не импортирован
+        result = task.func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            status = Job.QUEUED
+            delay = timedelta(seconds=job.retry_delay * 2 ** (job.attempts - 1))
+            Job.objects.filter(pk=pk).update(status=status, run_at=now + delay, error=error)
+        else:
+            status = Job.FAILED
+            Job.objects.filter(pk=pk).update(status=status, finished_at=now, error=error)
+        logger.warning("Задача #%s %s, попытка %s/%s: ошибка\n%s", pk, job.name, job.attempts, job.max_attempts, error)
+    else:
+        status = Job.DONE
+        Job.objects.filter(pk=pk).update(status=status, result=result, finished_at=timezone.now(), error='')
+    finally:
+        heartbeat.stop()
+        close_old_connections()
+    return status
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """
+    Вернуть в очередь задачи в running, которые не отмечали heartbeat дольше older_than
+    (процесс воркера убит). Попытка при этом считается использованной. Возвращает число задач.
+    """
+    cutoff = timezone.now() - older_than
+    stale = Job.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=Job.RUNNING,
+    )
+    note = "Воркер не завершил задачу (перезапуск или падение процесса)."
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), error=note,
+    )
+    requeued = stale.update(status=Job.QUEUED, run_at=timezone.now(), error=note)
+    return failed + requeued
+
@@ -0,0 +1,119 @@
+import asyncio
+import math
+import queue
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from app import benchmark, synthetic
+
+MODES = ('wsgi', 'asgi')
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return latencies[math.ceil(p / 100 * len(latencies)) - 1] * 1000
+
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': pct(95),
+        'p99': pct(99),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнить задержки читающих страниц: синхронные view через WSGI-обработчик в пуле потоков "
+        "и async-варианты через ASGI-обработчик в одном event loop, с одинаковой параллельностью"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(synthetic.SCALES), default='small')
+        parser.add_argument('--requests', type=int, default=200, help="запросов на сценарий")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        scenarios = [scenario for scenario in benchmark.SCENARIOS if not scenario.data]
+        try:
+            with benchmark.scratch_database(on_disk=True):
+                ctx = benchmark.fill(synthetic.SCALES[options['scale']], seed=options['seed'])
+                for scenario in scenarios:
+                    rows = {}
+                    for mode in MODES:
+                        benchmark.use_async_views(mode == 'asgi')
+                        run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+                        rows[mode] = run(scenario, ctx, options['requests'], options['concurrency'])
+                    self.report(scenario.name, rows)
+        finally:
+            benchmark.use_async_views(False)
+
+    def report(self, name, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for mode, row in rows.items():
+            self.stdout.write(
+                f"  {mode}  {row['rps']:>7.1f} req/s  p50 {row['p50']:>7.1f} ms  "
+                f"p95 {row['p95']:>7.1f} ms  p99 {row['p99']:>7.1f} ms"
+            )
+
+    @staticmethod
+    def run_wsgi(scenario, ctx, requests, concurrency):
+        user = User.objects.get(username=ctx[scenario.user])
+        url = scenario.url(ctx)
+        clients = queue.SimpleQueue()  # по клиенту (сессии) на поток, вход — заранее
+        for _ in range(concurrency):
+            client = Client()
+            client.force_login(user)
+            clients.put(client)
+
+        def one(_):
+            client = clients.get()
+            try:
+                start = time.perf_counter()
+                client.get(url)
+                return time.perf_counter() - start
+            finally:
+                clients.put(client)
+
+        one(None)  # прогрев кэшей
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(one, range(requests)))
+        return _summary(latencies, time.perf_counter() - start)
+
+    @staticmethod
+    def run_asgi(scenario, ctx, requests, concurrency):
+        user = User.objects.get(username=ctx[scenario.user])
+        url = scenario.url(ctx)
+
+        async def main():
+            clients = [AsyncClient() for _ in range(concurrency)]
+            for client in clients:
+                await client.aforce_login(user)
+            await clients[0].get(url)  # прогрев кэшей
+            remaining = [requests]
+            latencies = []
+
+            async def worker(client):
+                while remaining[0] > 0:
+                    remaining[0] -= 1
+                    # как ASGIHandler под настоящим сервером: синхронные части запроса — в своём потоке
+                    async with ThreadSensitiveContext():
+                        start = time.perf_counter()
+                        await client.get(url)
+                        latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(client) for client in clients))
+            return latencies, time.perf_counter() - start
+
+        latencies, elapsed = asyncio.run(main())
+        return _summary(latencies, elapsed)
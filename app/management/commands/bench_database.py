@@ -0,0 +1,122 @@
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F, Sum
+
+from app.models import Fabric, MaterialTransaction
+
+PROFILES = {
+    # профиль → OPTIONS соединения SQLite и режим журнала (на рабочей базе его включает миграция)
+    'plain': ({}, 'DELETE'),
+    'tuned': (settings.SQLITE_OPTIONS, 'WAL'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Параллельная нагрузка на SQLite: писатели двигают остатки (UPDATE + запись журнала), "
+        "читатели считают итоги. Сравнивает профиль без настроек и профиль из settings.SQLITE_OPTIONS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--ops', type=int, default=200, help="операций на поток")
+        parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                            help="какой профиль мерить (по умолчанию оба)")
+
+    def handle(self, *args, **options):
+        workdir = Path(tempfile.mkdtemp(prefix='bench-db-'))
+        try:
+            for name in options['profile'] or sorted(PROFILES):
+                result = self.run_profile(name, workdir, options)
+                self.stdout.write(
+                    f"{name:<6} записей/с {result['throughput']:>8.1f}  "
+                    f"успешно {result['done']:>5}  «database is locked» {result['locked']:>5}  "
+                    f"p50 {result['p50']:.1f} ms  p95 {result['p95']:.1f} ms"
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_profile(self, name, workdir, options):
+        alias = f'bench_{name}'
+        connection_options, journal_mode = PROFILES[name]
+        config = dict(connections.settings['default'])
+        config.update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(workdir / f'{name}.sqlite3'),
+            'OPTIONS': dict(connection_options),
+        })
+        connections.settings[alias] = config
+
+        # нужны только ткани и журнал движений (+ пользователи для его FK) — без миграций всей схемы
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        with connections[alias].schema_editor() as editor:
+            editor.create_model(User)
+            editor.create_model(Fabric)
+            editor.create_model(MaterialTransaction)
+        fabrics = Fabric.objects.using(alias).bulk_create(
+            [Fabric(name=f'bench {i}', quantity=0, price=1) for i in range(10)]
+        )
+        connections[alias].close()
+
+        latencies, locked = [], [0]
+        lock = threading.Lock()
+
+        def writer(index):
+            fabric = fabrics[index % len(fabrics)]
+            for _ in range(options['ops']):
+                start = time.perf_counter()
+                try:
+                    # как view прихода: прочитать позицию, затем stock.move_fabric —
+                    # UPDATE остатка + строка журнала. Чтение перед записью в DEFERRED-транзакции
+                    # и даёт «database is locked»: повышение блокировки не ждёт busy_timeout.
+                    with transaction.atomic(using=alias):
+                        Fabric.objects.using(alias).get(pk=fabric.pk)
+                        Fabric.objects.using(alias).filter(pk=fabric.pk).update(quantity=F('quantity') + 1)
+                        MaterialTransaction.objects.using(alias).create(
+                            fabric_id=fabric.pk, transaction_type=MaterialTransaction.IN, amount=1,
+                        )
+                except OperationalError:
+                    with lock:
+                        locked[0] += 1
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            connections[alias].close()
+
+        def reader():
+            for _ in range(options['ops']):
+                try:
+                    MaterialTransaction.objects.using(alias).aggregate(total=Sum('amount'))
+                except OperationalError:
+                    with lock:
+                        locked[0] += 1
+            connections[alias].close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'done': len(latencies),
+            'locked': locked[0],
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies) * 1000 if latencies else 0,
+            'p95': latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0,
+        }
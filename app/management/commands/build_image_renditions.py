@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from app.images import build_renditions, mark_renditions
+from app.models import Fabric, Product
+
+
+class Command(BaseCommand):
+    help = "Нарезать уменьшенные копии (WebP/JPEG) для всех изображений тканей и продуктов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Пересоздать уже существующие копии")
+
+    def handle(self, *args, **options):
+        created = 0
+        for model in (Fabric, Product):
+            for obj in model.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image').iterator():
+                try:
+                    created += build_renditions(obj.image, force=options['force'])
+                except (OSError, ValueError) as exc:
+                    self.stderr.write(f"{model.__name__} #{obj.pk}: {exc}")
+                else:
+                    mark_renditions(obj)
+
+        self.stdout.write(self.style.SUCCESS(f"Создано файлов: {created}."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from app import benchmark, queryplans, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогнать горячие view на синтетических данных в тестовой базе, выполнить EXPLAIN "
+        "для каждого их SELECT и завершиться ошибкой, если журнал или лог читается полным просмотром"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(synthetic.SCALES), default='medium')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor not in queryplans.EXPLAINERS:
+            raise CommandError(f"EXPLAIN для {connection.vendor} не поддерживается.")
+
+        problems = []
+        with benchmark.scratch_database():
+            ctx = benchmark.fill(synthetic.SCALES[options['scale']], seed=options['seed'])
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')  # планировщику нужна статистика по свежим данным
+            for scenario in benchmark.SCENARIOS:
+                client = benchmark.login(scenario, ctx)
+                with CaptureQueriesContext(connection) as queries:
+                    benchmark.request(client, scenario, ctx)
+                # одинаковые запросы (например, в цикле) проверяем один раз
+                statements = list(dict.fromkeys(query['sql'] for query in queries))
+                found = [(sql, scans) for sql in statements if (scans := queryplans.full_scans(connection, sql))]
+                problems += [(scenario.name, sql, scans) for sql, scans in found]
+                status = self.style.ERROR("полный просмотр") if found else self.style.SUCCESS("OK")
+                self.stdout.write(f"  {scenario.name:<20} запросов {len(statements):>3}  {status}")
+
+        for name, sql, scans in problems:
+            self.stdout.write(f"\n{name}:\n  " + "\n  ".join(scans) + f"\n  {sql[:500]}")
+        if problems:
+            raise CommandError(f"Полный просмотр больших таблиц в {len(problems)} запросах.")
+        self.stdout.write(self.style.SUCCESS("Все запросы горячих view используют индексы."))
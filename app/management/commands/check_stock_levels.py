@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from app import alerts
+
+
+class Command(BaseCommand):
+    help = "Найти ткани и продукты ниже точки заказа или близкие к нулю и обновить панель алертов"
+
+    def handle(self, *args, **options):
+        found = alerts.sweep()
+        for alert in sorted(found.values(), key=lambda a: (a['kind'], a['name'])):
+            days = f"~{alert['days_left']} дн." if alert['days_left'] is not None else "—"
+            self.stdout.write(
+                f"[{alert['kind']}] {alert['name']}: {alert['quantity']} {alert['unit']} "
+                f"(точка заказа {alert['reorder_point']}, хватит на {days})"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Позиций с низким остатком: {len(found)}."))
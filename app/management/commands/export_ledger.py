@@ -0,0 +1,39 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import exports
+
+
+class Command(BaseCommand):
+    help = "Выгрузить журнал движений тканей или продуктов в CSV/XLSX (потоком, без загрузки в память)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.LEDGERS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help="YYYY-MM-DD (включительно)")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help="YYYY-MM-DD (включительно)")
+        parser.add_argument('--item', type=int, help="id ткани или продукта")
+        parser.add_argument('--type', dest='transaction_type', choices=('IN', 'OUT'))
+        parser.add_argument('-o', '--output', help="файл (по умолчанию — stdout)")
+
+    def handle(self, *args, **options):
+        if options['format'] == 'xlsx' and not options['output']:
+            raise CommandError("Для XLSX укажите файл через --output.")
+        chunks = exports.export(
+            options['kind'], options['format'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            item=options['item'],
+            transaction_type=options['transaction_type'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Готово: {options['output']}"))
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
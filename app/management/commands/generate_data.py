@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from app import synthetic
+
+
+class Command(BaseCommand):
+    help = "Заполнить базу синтетическими тканями, продуктами, работниками, логами и движениями"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(synthetic.SCALES), default='small',
+                            help="готовый набор размеров (отдельные значения ниже его переопределяют)")
+        for name in ('fabrics', 'products', 'workers', 'logs', 'transactions'):
+            parser.add_argument(f'--{name}', type=int)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help="префикс имён, чтобы не пересечься с данными")
+
+    def handle(self, *args, **options):
+        counts = dict(synthetic.SCALES[options['scale']])
+        counts.update({name: options[name] for name in counts if options[name] is not None})
+        info = synthetic.generate(**counts, seed=options['seed'], prefix=options['prefix'])
+        self.stdout.write(self.style.SUCCESS(
+            "Создано: " + ", ".join(f"{key} {value}" for key, value in info.items())
+            + f" (пароль пользователей: {synthetic.PASSWORD})"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import importer
+
+
+class Command(BaseCommand):
+    help = "Импорт тканей или продуктов из CSV/XLSX (upsert по имени, начальные остатки приходом)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importer.IMPORTS))
+        parser.add_argument('path', help="файл .csv (UTF-8) или .xlsx; первая строка — заголовки колонок")
+        parser.add_argument('--dry-run', action='store_true', help="только проверить и показать ошибки")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = importer.import_rows(
+                    options['kind'], importer.read_file(fh, options['path']), dry_run=options['dry_run'],
+                )
+        except (OSError, importer.ImportFileError) as exc:
+            raise CommandError(exc)
+
+        for line, message in result.errors:
+            self.stderr.write(f"строка {line}: {message}")
+        summary = (
+            f"Строк: {result.rows}, новых: {result.created}, обновлено: {result.updated}, "
+            f"начальных остатков: {result.opening_balances}."
+        )
+        if result.errors:
+            raise CommandError(f"Ошибок: {len(result.errors)} — ничего не записано. {summary}")
+        if result.dry_run:
+            self.stdout.write(f"Проверка пройдена (ничего не записано). {summary}")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Импорт завершён. {summary}"))
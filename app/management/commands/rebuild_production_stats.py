@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum, Max
+
+from app.models import WorkerProductLog, ProductProductionStats
+
+
+class Command(BaseCommand):
+    help = "Пересобрать сводку производства (ProductProductionStats) из WorkerProductLog"
+
+    def handle(self, *args, **options):
+        rows = (
+            WorkerProductLog.objects
+            .filter(product__isnull=False)
+            .values('product')
+            .annotate(total_qty=Sum('quantity'), last_date=Max('date'))
+        )
+
+        with transaction.atomic():
+            ProductProductionStats.objects.all().delete()
+            created = ProductProductionStats.objects.bulk_create(
+                [
+                    ProductProductionStats(
+                        product_id=row['product'],
+                        total_qty=row['total_qty'] or 0,
+                        last_date=row['last_date'],
+                    )
+                    for row in rows.iterator()
+                ],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Сводка пересобрана: {len(created)} продуктов."))
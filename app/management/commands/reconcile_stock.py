@@ -0,0 +1,89 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.snapshots import KINDS, ledger_delta
+
+ADJUSTMENT_NOTE = "Корректировка сверки"
+CENT = Decimal('0.01')
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверить остатки тканей и продуктов с журналом движений (и выпуском продукции) "
+        "и показать расхождения; --repair дописывает корректирующие движения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(KINDS), help="только ткани или только продукты")
+        parser.add_argument('--repair', action='store_true',
+                            help="записать приход/расход на разницу, чтобы журнал сошёлся с остатком")
+
+    def handle(self, *args, **options):
+        kinds = [options['kind']] if options['kind'] else list(KINDS)
+        total_drift = repaired = 0
+        for kind in kinds:
+            drift = self.reconcile(kind)
+            total_drift += len(drift)
+            if drift and options['repair']:
+                repaired += self.repair(kind, drift)
+
+        if not total_drift:
+            self.stdout.write(self.style.SUCCESS("Расхождений нет."))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f"Исправлено расхождений: {repaired}."))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"Расхождений: {total_drift}. Запустите с --repair, чтобы записать корректировки."
+            ))
+
+    def reconcile(self, kind):
+        """[(id, имя, остаток, по журналу)] для позиций, где остаток не равен сумме журнала."""
+        model, _, _ = KINDS[kind]
+        expected = ledger_delta(kind)  # один GROUP BY на таблицу, по всей истории
+        drift = []
+        for pk, name, quantity in model.objects.values_list('pk', 'name', 'quantity').order_by('pk').iterator():
+            ledger = expected.get(pk, Decimal('0')).quantize(CENT)
+            if quantity != ledger:
+                drift.append((pk, name, quantity, ledger))
+                self.stdout.write(
+                    f"[{kind}] {name} (#{pk}): остаток {quantity}, по журналу {ledger}, разница {quantity - ledger:+}"
+                )
+        return drift
+
+    def repair(self, kind, drift):
+        """
+        Записать корректировки; возвращает их число.
+
+        Сверка читала журнал и остатки разными запросами без блокировок: движение, закоммиченное
+        между ними, выглядит как расхождение. Поэтому каждая позиция перепроверяется заново
+        под блокировкой строки (движения по ней ждут конца транзакции), и корректировка
+        пишется, только если расхождение подтвердилось.
+        """
+        # Остаток считается верным (ручная правка или обрезка на нуле — это факт склада),
+        # поэтому корректируется журнал, а не количество
+        model, ledger, fk = KINDS[kind]
+        with transaction.atomic():
+            current = dict(
+                model.objects.select_for_update()
+                .filter(pk__in=[pk for pk, *_ in drift]).order_by('pk').values_list('pk', 'quantity')
+            )
+            expected = ledger_delta(kind, item_ids=list(current))
+            adjustments = []
+            for pk, name, *_ in drift:
+                if pk not in current:
+                    continue  # позицию удалили
+                quantity, ledger_sum = current[pk], expected.get(pk, Decimal('0')).quantize(CENT)
+                if quantity == ledger_sum:
+                    self.stdout.write(f"[{kind}] {name} (#{pk}): при повторной проверке расхождения нет")
+                    continue
+                adjustments.append(ledger(**{
+                    f'{fk}_id': pk,
+                    'transaction_type': ledger.IN if quantity > ledger_sum else ledger.OUT,
+                    'amount': abs(quantity - ledger_sum),
+                    'note': ADJUSTMENT_NOTE,
+                }))
+            ledger.objects.bulk_create(adjustments, batch_size=BATCH_SIZE)
+        return len(adjustments)
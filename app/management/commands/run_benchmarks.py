@@ -0,0 +1,83 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from app import benchmark, synthetic
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Command(BaseCommand):
+    help = (
+        "Замерить основные view (задержка, число SQL, пиковая память) на синтетических данных "
+        "в отдельной тестовой базе и сохранить результат в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', choices=sorted(synthetic.SCALES),
+                            help="масштаб данных (можно несколько; по умолчанию small)")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('-o', '--output', help="файл JSON (по умолчанию .benchmarks/<commit>.json)")
+        parser.add_argument('--compare', help="JSON прошлого прогона — показать изменение p50 и числа SQL")
+
+    def handle(self, *args, **options):
+        scales = options['scale'] or ['small']
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Не удалось прочитать {options['compare']}: {exc}")
+
+        commit = _git_commit()
+        report = {
+            'commit': commit,
+            'created': timezone.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'scales': {},
+        }
+
+        with benchmark.scratch_database():
+            for scale in scales:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Масштаб {scale}: {synthetic.SCALES[scale]}"))
+                report['scales'][scale] = benchmark.run(
+                    synthetic.SCALES[scale], iterations=options['iterations'], seed=options['seed'],
+                    log=lambda name, row: self.stdout.write(self._line(name, row, baseline, scale)),
+                )
+
+        output = Path(options['output'] or settings.BASE_DIR / '.benchmarks' / f'{commit}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(f"Результат: {output}"))
+
+    @staticmethod
+    def _line(name, row, baseline, scale):
+        line = (
+            f"  {name:<20} {row['status']}  p50 {row['p50_ms']:>8} ms  p95 {row['p95_ms']:>8} ms  "
+            f"cold {row['cold_ms']:>8} ms  SQL {row['queries']:>3} (cold {row['queries_cold']})  "
+            f"peak {row['peak_kb']} KB"
+        )
+        old = ((baseline or {}).get('scales', {}).get(scale, {}).get('scenarios', {})).get(name)
+        if old and old.get('p50_ms'):
+            change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+            line += f"  | p50 {change:+.0f}%, SQL {old['queries']} → {row['queries']}"
+        return line
@@ -0,0 +1,105 @@
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from app import jobs, worker_process
+
+REQUEUE_EVERY = 60  # секунд между проверками «зависших» задач
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполнять фоновые задачи из очереди (модель Job) в пуле процессов: "
+        "миниатюры, выгрузки журналов, сервисные команды"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help="процессов в пуле; 0 — выполнять в этом процессе")
+        parser.add_argument('--poll', type=float, default=1.0, help="пауза опроса пустой очереди, с")
+        parser.add_argument('--once', action='store_true', help="выйти, когда готовых задач не останется")
+        parser.add_argument('--stale-after', type=int, default=int(jobs.STALE_AFTER.total_seconds()),
+                            help="через сколько секунд задача в running считается брошенной")
+
+    def handle(self, *args, **options):
+        self.worker = jobs.worker_id()
+        self.stale_after = timedelta(seconds=options['stale_after'])
+        self.processed = 0
+        self.last_requeue = 0.0
+        self.stopping = False
+        previous = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            if options['processes'] > 0:
+                self.run_pool(options['processes'], options['poll'], options['once'])
+            else:
+                self.run_inline(options['poll'], options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write("Прервано.")
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f"Выполнено задач: {self.processed}."))
+
+    def stop(self, signum, frame):
+        """Ctrl-C или SIGTERM: новые задачи не брать, взятые доработать. Повторный сигнал — прервать."""
+        if self.stopping:
+            raise KeyboardInterrupt
+        self.stopping = True
+        self.stdout.write("Остановка: дорабатываем взятые задачи (повторный сигнал — прервать)…")
+
+    def requeue(self):
+        if time.monotonic() - self.last_requeue < REQUEUE_EVERY:
+            return
+        self.last_requeue = time.monotonic()
+        count = jobs.requeue_stale(self.stale_after)
+        if count:
+            self.stderr.write(f"Брошенных задач возвращено в очередь или закрыто: {count}")
+
+    def done(self, pk, status):
+        self.processed += 1
+        self.stdout.write(f"#{pk}: {status}")
+
+    def run_inline(self, poll, once):
+        while not self.stopping:
+            self.requeue()
+            pk = jobs.claim(self.worker)
+            if pk is None:
+                if once:
+                    return
+                time.sleep(poll)
+                continue
+            self.done(pk, jobs.execute(pk))
+
+    def run_pool(self, processes, poll, once):
+        # spawn: дочерние процессы не наследуют открытые соединения с базой и потоки родителя;
+        # инициализатор из модуля без моделей: app.jobs можно импортировать только после django.setup
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        running = {}
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=worker_process.init) as pool:
+            while running or not self.stopping:
+                self.requeue()
+                while len(running) < processes and not self.stopping:
+                    pk = jobs.claim(self.worker)
+                    if pk is None:
+                        break
+                    running[pool.submit(jobs.execute, pk)] = pk
+
+                if not running:
+                    if once or self.stopping:
+                        return
+                    time.sleep(poll)
+                    continue
+
+                finished, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pk = running.pop(future)
+                    try:
+                        self.done(pk, future.result())
+                    except Exception as exc:  # процесс пула упал — задачу вернёт requeue_stale
+                        self.stderr.write(f"#{pk}: процесс воркера завершился с ошибкой: {exc}")
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app import snapshots
+from app.models import StockSnapshot
+
+
+class Command(BaseCommand):
+    help = "Снять остатки всех тканей и продуктов (опорные точки для отчёта «остатки на дату»); запускать по расписанию"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=0,
+                            help="удалить снимки старше N дней (0 — хранить все)")
+
+    def handle(self, *args, **options):
+        count = snapshots.take_snapshot()
+        self.stdout.write(self.style.SUCCESS(f"Снимок сделан: {count} позиций."))
+        if options['keep_days'] > 0:
+            cutoff = timezone.now() - timedelta(days=options['keep_days'])
+            deleted, _ = StockSnapshot.objects.filter(taken_at__lt=cutoff).delete()
+            self.stdout.write(f"Удалено старых снимков: {deleted}.")
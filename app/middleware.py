@@ -0,0 +1,84 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+
+from . import profiling
+from .decorators import get_roles
+
+
+class UserRolesMiddleware:
+    """
+    Добавляет request.user_roles — набор групп текущего пользователя.
+    Роли вычисляются лениво и один раз за запрос; декораторы и шаблоны
+    пользуются тем же кэшем через get_roles()/has_role().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.user_roles = SimpleLazyObject(lambda: get_roles(request.user))
+        return self.get_response(request)  # под ASGI — корутина, её дождётся вызывающий
+
+
+class RequestProfilerMiddleware:
+    """
+    Замеряет каждый запрос: число SQL и их время (connection.execute_wrapper),
+    время рендера шаблонов, размер ответа — и копит по имени view (app.profiling).
+    Стоит первым в MIDDLEWARE, чтобы учесть и запросы сессии/пользователя.
+    Для потоковых ответов учитывается только время до первого байта.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = profiling.RequestProfile()
+        token = profile.activate()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            profile.deactivate(token)
+        self.record(request, response, time.perf_counter() - start, profile)
+        return response
+
+    async def __acall__(self, request):
+        # соединения БД привязаны к потоку: SQL (и async ORM, и sync view) под ASGI идёт
+        # в потоке sync_to_async этого запроса — обёртку ставим на соединение того потока
+        profile = profiling.RequestProfile()
+        token = profile.activate()
+        start = time.perf_counter()
+        await sync_to_async(lambda: connection.execute_wrappers.append(profile))()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(lambda: connection.execute_wrappers.remove(profile))()
+            profile.deactivate(token)
+        self.record(request, response, time.perf_counter() - start, profile)
+        return response
+
+    @staticmethod
+    def record(request, response, duration, profile):
+        match = request.resolver_match
+        size = None if response.streaming else len(response.content)
+        profiling.record(match.view_name if match else '-', duration, profile, size, request.path)
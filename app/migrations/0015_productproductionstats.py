@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Max, Sum
+
+
+def fill_stats(apps, schema_editor):
+    WorkerProductLog = apps.get_model('app', 'WorkerProductLog')
+    ProductProductionStats = apps.get_model('app', 'ProductProductionStats')
+    rows = (
+        WorkerProductLog.objects
+        .filter(product__isnull=False)
+        .values('product')
+        .annotate(total_qty=Sum('quantity'), last_date=Max('date'))
+    )
+    ProductProductionStats.objects.bulk_create([
+        ProductProductionStats(product_id=r['product'], total_qty=r['total_qty'] or 0, last_date=r['last_date'])
+        for r in rows
+    ])
+
+
+def fold_production(apps, schema_editor, sign=1):
+    """
+    Раньше остаток продукта считался как «произведено + quantity»; теперь каждый лог
+    производства сам прибавляется к quantity (сигналы WorkerProductLog). Переносим уже
+    произведённое в quantity, чтобы остатки и сверка с журналом не изменились.
+    """
+    WorkerProductLog = apps.get_model('app', 'WorkerProductLog')
+    Product = apps.get_model('app', 'Product')
+    rows = (
+        WorkerProductLog.objects
+        .filter(product__isnull=False)
+        .values_list('product')
+        .annotate(total_qty=Sum('quantity'))
+    )
+    for product_id, total_qty in rows:
+        Product.objects.filter(pk=product_id).update(quantity=F('quantity') + sign * (total_qty or 0))
+
+
+def unfold_production(apps, schema_editor):
+    fold_production(apps, schema_editor, sign=-1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_product_unit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductProductionStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='production_stats', serialize=False, to='app.product')),
+                ('total_qty', models.PositiveBigIntegerField(default=0)),
+                ('last_date', models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+        migrations.RunPython(fold_production, unfold_production),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_productproductionstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='materialtransaction',
+            index=models.Index(fields=['fabric', 'created_at', 'id'], name='mattx_fabric_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producttransaction',
+            index=models.Index(fields=['product', 'created_at', 'id'], name='prodtx_product_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_transaction_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fabric',
+            name='reorder_point',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
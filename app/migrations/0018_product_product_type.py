@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_reorder_point'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='product_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='app.producttype'),
+        ),
+    ]
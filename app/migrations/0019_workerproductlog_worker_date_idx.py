@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_product_product_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workerproductlog',
+            index=models.Index(fields=['worker', 'date'], name='workerlog_worker_date_idx'),
+        ),
+    ]
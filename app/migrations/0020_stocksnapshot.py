@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_workerproductlog_worker_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fabric', 'Ткань'), ('product', 'Продукт')], max_length=10)),
+                ('item_id', models.PositiveIntegerField()),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('taken_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'taken_at'], name='snapshot_kind_taken_idx')],
+            },
+        ),
+    ]
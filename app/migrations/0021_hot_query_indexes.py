@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_stocksnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fabricchangelog',
+            index=models.Index(fields=['fabric', 'timestamp'], name='fabriclog_fabric_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name'], name='product_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workerproductlog',
+            index=models.Index(fields=['product', 'date'], name='workerlog_product_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workerproductlog',
+            name='client_key',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
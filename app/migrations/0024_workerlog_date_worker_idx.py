@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_workerproductlog_client_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workerproductlog',
+            index=models.Index(fields=['date', 'worker'], name='workerlog_date_worker_idx'),
+        ),
+    ]
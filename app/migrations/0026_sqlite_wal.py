@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def set_journal_mode(mode):
+    def apply(apps, schema_editor):
+        connection = schema_editor.connection
+        # режим журнала хранится в файле базы; у базы в памяти WAL не бывает
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode={mode}')
+    return apply
+
+
+class Migration(migrations.Migration):
+    # journal_mode нельзя сменить внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('app', '0025_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_journal_mode('WAL'), set_journal_mode('DELETE')),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:39
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+from app.images import rendition_name
+
+
+def mark_existing(apps, schema_editor):
+    # копии, нарезанные до появления отметки: один раз проверить хранилище вместо каждого рендера
+    for name in ('Fabric', 'Product'):
+        model = apps.get_model('app', name)
+        for pk, image in model.objects.exclude(image='').exclude(image__isnull=True).values_list('pk', 'image'):
+            if default_storage.exists(rendition_name(image, 'card', 1, 'jpg')):
+                model.objects.filter(pk=pk).update(image_renditions=image)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0026_sqlite_wal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fabric',
+            name='image_renditions',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_renditions',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(mark_existing, migrations.RunPython.noop),
+    ]
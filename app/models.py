@@ -1,5 +1,7 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Fabric(models.Model):
@@ -12,7 +14,9 @@ class Fabric(models.Model):
     quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     unit = models.CharField(max_length=10, choices=UNIT_CHOICES, default='kg')
+    reorder_point = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # 0 — не следить
     image = models.ImageField(upload_to='fabrics/', blank=True, null=True)
+    image_renditions = models.CharField(max_length=100, blank=True, editable=False)  # для какого файла нарезаны копии
     created_at = models.DateTimeField(auto_now_add=True)
 
 
@@ -31,11 +35,24 @@ class FabricChangeLog(models.Model):
     change_length = models.FloatField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # журнал изменений ткани: WHERE fabric_id = ? ORDER BY timestamp
+            models.Index(fields=['fabric', 'timestamp'], name='fabriclog_fabric_ts_idx'),
+        ]
+
     def __str__(self):
         return f"{self.fabric.name} - {self.get_action_display()} - {self.timestamp.strftime('%Y-%m-%d')}"
 
 
 
+class ProductType(models.Model):
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+
 class Product(models.Model):
     UNIT_CHOICES = [
         ('pcs', 'шт.'),
@@ -46,10 +63,21 @@ class Product(models.Model):
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     unit = models.CharField(max_length=10, choices=UNIT_CHOICES, default='pcs')  # <-- добавлено
+    product_type = models.ForeignKey(
+        ProductType, on_delete=models.SET_NULL, null=True, blank=True, related_name='products'
+    )  # рецепт (MaterialForProduct) — сколько ткани уходит на единицу
+    reorder_point = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # 0 — не следить
     is_active = models.BooleanField(default=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_renditions = models.CharField(max_length=100, blank=True, editable=False)  # для какого файла нарезаны копии
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # выбор продукта в формах выпуска: WHERE is_active ORDER BY name — неактивные в индекс не попадают
+            models.Index(fields=['name'], condition=models.Q(is_active=True), name='product_active_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -60,19 +88,39 @@ class WorkerProductLog(models.Model):
     product_name = models.CharField(max_length=255)  # запасной текст, если продукт удалён
     quantity = models.PositiveIntegerField()
     date = models.DateField(auto_now_add=True)
+    # ключ идемпотентности офлайн-ввода (генерирует браузер): повторная синхронизация не создаёт дубль
+    client_key = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # история работника: WHERE worker_id = ? ORDER BY date
+            models.Index(fields=['worker', 'date'], name='workerlog_worker_date_idx'),
+            # отчёт о выработке: WHERE date >= ? AND date < ? GROUP BY период, работник
+            models.Index(fields=['date', 'worker'], name='workerlog_date_worker_idx'),
+            # карточка продукта и сводка выпуска: WHERE product_id = ? ORDER BY date
+            models.Index(fields=['product', 'date'], name='workerlog_product_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.worker} - {self.product or self.product_name} - {self.quantity}"
 
 
-
-class ProductType(models.Model):
-    name = models.CharField(max_length=100)
+class ProductProductionStats(models.Model):
+    """
+    Сводка производства по продукту (сколько всего произведено и когда последний раз).
+    Поддерживается сигналами WorkerProductLog, пересобирается командой rebuild_production_stats.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='production_stats'
+    )
+    total_qty = models.PositiveBigIntegerField(default=0)
+    last_date = models.DateField(null=True, blank=True)
 
     def __str__(self):
-        return self.name
-    
-    
+        return f"{self.product} - {self.total_qty}"
+
+
+
 class MaterialForProduct(models.Model):
     product_type = models.ForeignKey(ProductType, on_delete=models.CASCADE)
     fabric = models.ForeignKey(Fabric, on_delete=models.CASCADE)
@@ -96,6 +144,12 @@ class MaterialTransaction(models.Model):
     note = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # история по ткани: keyset-пагинация по (created_at, id)
+            models.Index(fields=['fabric', 'created_at', 'id'], name='mattx_fabric_created_idx'),
+        ]
+
 
 
 class ProductTransaction(models.Model):
@@ -114,6 +168,88 @@ class ProductTransaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at', 'id'], name='prodtx_product_created_idx'),
+        ]
+
+
+
+
+
+class StockSnapshot(models.Model):
+    """
+    Остаток позиции склада на момент taken_at. Снимки всех позиций делаются пачкой
+    командой snapshot_stock (по расписанию) и служат опорными точками для
+    восстановления остатков на любую дату (app.snapshots.balances_at).
+    """
+    FABRIC = 'fabric'
+    PRODUCT = 'product'
+    KINDS = [
+        (FABRIC, 'Ткань'),
+        (PRODUCT, 'Продукт'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    item_id = models.PositiveIntegerField()  # Fabric.pk или Product.pk
+    quantity = models.DecimalField(max_digits=12, decimal_places=2)
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'taken_at'], name='snapshot_kind_taken_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.item_id} - {self.quantity} ({self.taken_at:%Y-%m-%d %H:%M})"
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди (app.jobs): имя зарегистрированной функции и её аргументы.
+    Выполняется командой run_worker; упавшая задача повторяется до max_attempts раз.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=200)  # app.tasks.build_image_renditions
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField(default=0)  # больше — раньше
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    retry_delay = models.PositiveIntegerField(default=30)  # секунд до первого повтора, дальше вдвое больше
+    run_at = models.DateTimeField(default=timezone.now)  # не раньше — для повторов с задержкой
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # последняя отметка «жив» выполняющей задачу
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)  # хост:pid воркера, взявшего задачу
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # выбор следующей задачи: WHERE status = 'queued' AND run_at <= now ORDER BY priority DESC, run_at
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.get_status_display()})"
 
+    @property
+    def short_name(self):
+        return self.name.rsplit('.', 1)[-1]
 
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
@@ -0,0 +1,140 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+PAGE_SIZE = 50
+CURSOR_SALT = 'app.ledger-cursor'
+
+
+def signed_amount():
+    """Сумма операции со знаком: приход +, расход −."""
+    return Case(When(transaction_type='OUT', then=-F('amount')), default=F('amount'))
+
+
+def encode_cursor(created_at, pk, balance):
+    return signing.dumps(
+        {'t': created_at.isoformat(), 'id': pk, 'b': str(balance)},
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(raw):
+    if not raw:
+        return None
+    try:
+        data = signing.loads(raw, salt=CURSOR_SALT)
+        return datetime.fromisoformat(data['t']), int(data['id']), Decimal(data['b'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError, ArithmeticError):
+        return None
+
+
+def _day_start(day):
+    """Лог производства датирован днём — считаем его сделанным в начале дня (как snapshots.ledger_delta)."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _parse_before(before):
+    try:
+        return parse_date(before) if before else None
+    except ValueError:  # формат верный, а даты нет: 2024-02-30
+        return None
+
+
+def _page_query(queryset, current_balance, cursor, before, production):
+    """
+    Запрос страницы и остаток перед её первой строкой.
+
+    Возвращает (queryset, остаток, position, newer): position — момент, на который
+    посчитан остаток (None — сейчас); newer — что ещё вычесть из остатка, чтобы
+    перейти к ?before: [(queryset, агрегат)] движений и выпуска новее границы.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    balance = current_balance or Decimal('0')
+
+    position = decode_cursor(cursor)
+    before_date = _parse_before(before)
+
+    newer = []
+    if position:
+        created_at, pk, balance = position
+        position = created_at
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    elif before_date:
+        position = _day_start(before_date + timedelta(days=1))
+        newer.append((queryset.filter(created_at__gte=position), Sum(signed_amount())))
+        queryset = queryset.filter(created_at__lt=position)
+        if production is not None:
+            newer.append((production.filter(date__gt=before_date), Sum('quantity')))
+    return queryset, balance, position, newer
+
+
+def _produced(production, rows, position, page_size):
+    """Выпуск по дням, попадающим между последней строкой страницы и position: [(дата, сумма)] или None."""
+    if production is None or not rows:
+        return None
+    produced = production.filter(date__gte=timezone.localdate(rows[:page_size][-1].created_at))
+    if position is not None:
+        produced = produced.filter(date__lte=timezone.localdate(position))
+    return produced.values('date').annotate(total=Sum('quantity')).values_list('date', 'total').order_by('-date')
+
+
+def _finish_page(rows, balance, page_size, position=None, produced=()):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    # выпуск между строками тоже менял остаток: вычитаем его, проходя строки от новых к старым
+    produced = [
+        (moment, total) for moment, total in ((_day_start(day), total) for day, total in produced or ())
+        if position is None or moment < position
+    ]
+    for row in rows:
+        while produced and produced[0][0] > row.created_at:
+            balance -= produced.pop(0)[1]
+        row.balance = balance
+        if row.transaction_type == 'OUT':
+            balance += row.amount
+        else:
+            balance -= row.amount
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.pk, balance)
+    return rows, next_cursor
+
+
+def ledger_page(queryset, current_balance, cursor=None, before=None, page_size=PAGE_SIZE, production=None):
+    """
+    Одна страница истории (MaterialTransaction / ProductTransaction), новые сверху.
+
+    Пагинация по ключу (created_at, id) без OFFSET: курсор хранит последнюю
+    показанную строку и остаток перед ней, поэтому следующая страница
+    не пересчитывает всю историю. У каждой строки появляется .balance —
+    остаток сразу после операции (отсчитывается назад от текущего остатка).
+
+    before — дата 'YYYY-MM-DD': перейти к операциям до конца этого дня
+    (несуществующая дата игнорируется). production — логи производства позиции
+    (WorkerProductLog): у продуктов выпуск тоже прибавляется к остатку.
+    Возвращает (rows, next_cursor); next_cursor = None на последней странице.
+    """
+    queryset, balance, position, newer = _page_query(queryset, current_balance, cursor, before, production)
+    for moves, total in newer:
+        balance -= moves.aggregate(total=total)['total'] or 0
+    rows = list(queryset[:page_size + 1])
+    produced = _produced(production, rows, position, page_size)
+    return _finish_page(rows, balance, page_size, position, list(produced or ()))
+
+
+async def aledger_page(queryset, current_balance, cursor=None, before=None, page_size=PAGE_SIZE, production=None):
+    """То же для async view: aaggregate и асинхронная итерация вместо list()."""
+    queryset, balance, position, newer = _page_query(queryset, current_balance, cursor, before, production)
+    for moves, total in newer:
+        balance -= (await moves.aaggregate(total=total))['total'] or 0
+    rows = [row async for row in queryset[:page_size + 1]]
+    produced = _produced(production, rows, position, page_size)
+    return _finish_page(rows, balance, page_size, position, [row async for row in produced] if produced is not None else ())
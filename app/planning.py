@@ -0,0 +1,100 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from .models import Fabric, MaterialForProduct
+
+BOM_CACHE_KEY = 'bom-matrix'
+
+
+def load_matrix():
+    """
+    Рецепты всех продуктов одной структурой {product_id: {fabric_id: расход на единицу}}.
+    Читается одним запросом и живёт в кэше до изменения рецептов (см. invalidate_matrix).
+    """
+    matrix = cache.get(BOM_CACHE_KEY)
+    if matrix is None:
+        rows = (
+            MaterialForProduct.objects
+            .filter(product_type__products__isnull=False, quantity__gt=0)
+            .values_list('product_type__products', 'fabric_id', 'quantity')
+        )
+        matrix = defaultdict(dict)
+        for product_id, fabric_id, per_unit in rows:
+            recipe = matrix[product_id]
+            recipe[fabric_id] = recipe.get(fabric_id, Decimal('0')) + Decimal(str(per_unit))
+        matrix = dict(matrix)
+        cache.set(BOM_CACHE_KEY, matrix, None)
+    return matrix
+
+
+def invalidate_matrix():
+    cache.delete(BOM_CACHE_KEY)
+
+
+def stock_levels():
+    """Текущие остатки всех тканей {fabric_id: quantity} — один лёгкий запрос, всегда свежий."""
+    return {pk: max(qty, Decimal('0')) for pk, qty in Fabric.objects.values_list('pk', 'quantity')}
+
+
+def max_buildable(matrix=None, stock=None):
+    """
+    Сколько единиц каждого продукта можно собрать из текущих остатков (по отдельности).
+    {product_id: (количество, fabric_id ограничивающей ткани)}
+    """
+    matrix = load_matrix() if matrix is None else matrix
+    stock = stock_levels() if stock is None else stock
+    result = {}
+    for product_id, recipe in matrix.items():
+        best, limiting = None, None
+        for fabric_id, per_unit in recipe.items():
+            if per_unit <= 0:  # нулевой расход ничего не ограничивает
+                continue
+            can = int(stock.get(fabric_id, Decimal('0')) // per_unit)
+            if best is None or can < best:
+                best, limiting = can, fabric_id
+        result[product_id] = (best, limiting)
+    return result
+
+
+def plan(mix, matrix=None, stock=None):
+    """
+    Совместный план для набора {product_id: количество}.
+
+    Возвращает потребность по каждой ткани с нехваткой, ограничивающую ткань и
+    scale — какую долю всего набора можно собрать (1 и больше — набор выполним).
+    Количества и расходы не больше нуля пропускаются.
+    """
+    matrix = load_matrix() if matrix is None else matrix
+    stock = stock_levels() if stock is None else stock
+
+    required = defaultdict(Decimal)
+    for product_id, qty in mix.items():
+        if qty <= 0:
+            continue
+        for fabric_id, per_unit in matrix.get(product_id, {}).items():
+            if per_unit > 0:
+                required[fabric_id] += per_unit * qty
+
+    materials = []
+    scale, limiting = None, None
+    for fabric_id, needed in sorted(required.items()):
+        available = stock.get(fabric_id, Decimal('0'))
+        ratio = available / needed
+        if scale is None or ratio < scale:
+            scale, limiting = ratio, fabric_id
+        materials.append({
+            'fabric_id': fabric_id,
+            'required': needed,
+            'available': available,
+            'shortfall': max(needed - available, Decimal('0')),
+        })
+
+    return {
+        'materials': materials,
+        'feasible': all(m['shortfall'] == 0 for m in materials),
+        'limiting_fabric_id': limiting,
+        'scale': scale,
+        'unknown_products': [pk for pk in mix if pk not in matrix],
+    }
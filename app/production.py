@@ -0,0 +1,193 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from .models import (
+    WorkerProductLog, Product, Fabric, MaterialForProduct, MaterialTransaction, ProductProductionStats,
+)
+from .signals import stats_add
+from .stock import InsufficientStock, shift_quantity
+
+CENT = Decimal('0.01')
+
+# итог синхронизации одной офлайн-записи
+CREATED, DUPLICATE, REJECTED = 'created', 'duplicate', 'rejected'
+
+
+class MaterialShortage(Exception):
+    """Не хватает ткани по рецепту: shortages — список (fabric, нужно, есть)."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__("; ".join(
+            f"{fabric.name}: нужно {needed}, есть {available}" for fabric, needed, available in shortages
+        ))
+
+
+def produced_quantity(product_id):
+    """Сколько всего произведено продукта (из сводки ProductProductionStats)."""
+    stats = ProductProductionStats.objects.filter(product_id=product_id).values_list('total_qty', flat=True).first()
+    return stats or 0
+
+
+def required_materials(product_totals):
+    """
+    Сколько ткани нужно на произведённое: {product_id: qty} → {(fabric_id, product_id): amount}.
+    Рецепты всех продуктов читаются одним запросом.
+    """
+    required = defaultdict(Decimal)
+    recipes = (
+        MaterialForProduct.objects
+        .filter(product_type__products__in=list(product_totals))
+        .values_list('fabric_id', 'product_type__products', 'quantity')
+    )
+    for fabric_id, product_id, per_unit in recipes:
+        amount = (Decimal(str(per_unit)) * product_totals[product_id]).quantize(CENT)
+        if amount > 0:
+            required[(fabric_id, product_id)] += amount
+    return required
+
+
+def consume_materials(product_totals, user=None):
+    """
+    Списать ткани по рецептам продуктов (вызывать внутри transaction.atomic).
+
+    Нехватка проверяется сразу по всем тканям, чтобы отказ перечислил их все;
+    затем каждая ткань уменьшается одним условным UPDATE, а строки расхода
+    пишутся одним bulk_create. При любой нехватке — MaterialShortage.
+    """
+    required = required_materials(product_totals)
+    if not required:
+        return []
+
+    per_fabric = defaultdict(Decimal)
+    for (fabric_id, _), amount in required.items():
+        per_fabric[fabric_id] += amount
+
+    fabrics = Fabric.objects.in_bulk(list(per_fabric))
+    shortages = [
+        (fabrics[fabric_id], needed, fabrics[fabric_id].quantity)
+        for fabric_id, needed in sorted(per_fabric.items())
+        if needed > fabrics[fabric_id].quantity
+    ]
+    if shortages:
+        raise MaterialShortage(shortages)
+
+    for fabric_id, needed in sorted(per_fabric.items()):
+        try:
+            shift_quantity(Fabric, fabric_id, -needed)
+        except InsufficientStock as exc:
+            # остаток успели списать параллельно
+            raise MaterialShortage([(fabrics[fabric_id], needed, exc.available)])
+
+    names = dict(Product.objects.filter(pk__in=list(product_totals)).values_list('pk', 'name'))
+    return MaterialTransaction.objects.bulk_create([
+        MaterialTransaction(
+            fabric_id=fabric_id,
+            user=user,
+            transaction_type=MaterialTransaction.OUT,
+            amount=amount,
+            note=f"Расход по рецепту: {names.get(product_id, '')} × {product_totals[product_id]}",
+        )
+        for (fabric_id, product_id), amount in sorted(required.items())
+    ])
+
+
+def log_production(worker, product, quantity, user=None, product_name=''):
+    """Один лог производства + списание ткани по рецепту; при нехватке ничего не сохраняется."""
+    quantity = int(quantity)
+    with transaction.atomic():
+        log = WorkerProductLog.objects.create(
+            worker=worker,
+            product=product,
+            product_name=product_name or (product.name if product else ''),
+            quantity=quantity,
+        )
+        if product:
+            consume_materials({product.pk: quantity}, user=user)
+    return log
+
+
+def bulk_log_production(entries, user=None, client_keys=None):
+    """
+    Пакетная запись производства: entries — список (worker, product, quantity),
+    client_keys — параллельный список ключей идемпотентности (офлайн-ввод) или None.
+
+    Логи создаются одним bulk_create (сигналы WorkerProductLog при этом не срабатывают),
+    а остаток и сводка каждого продукта обновляются один раз на сумму всех его строк —
+    так склад считается ровно один раз. Ткани списываются по рецептам тем же пакетом.
+    Всё в одной транзакции.
+    """
+    keys = client_keys or [None] * len(entries)
+    logs = [
+        WorkerProductLog(
+            worker=worker, product=product, product_name=product.name, quantity=quantity, client_key=key,
+        )
+        for (worker, product, quantity), key in zip(entries, keys)
+    ]
+    if not logs:
+        return []
+
+    with transaction.atomic():
+        created = WorkerProductLog.objects.bulk_create(logs)
+
+        totals = defaultdict(int)
+        for log in created:
+            totals[log.product_id] += log.quantity
+
+        # Обновляем продукты в фиксированном порядке, чтобы параллельные пакеты не взаимоблокировались
+        for product_id in sorted(totals):
+            shift_quantity(Product, product_id, totals[product_id])
+            stats_add(product_id, totals[product_id], created[0].date)
+
+        consume_materials(totals, user=user)
+
+    return created
+
+
+def sync_production(entries, user=None):
+    """
+    Идемпотентная запись офлайн-ввода: entries — список (client_key, worker, product, quantity).
+
+    Записи, ключи которых уже есть в базе (прошлая синхронизация дошла, а ответ — нет),
+    пропускаются, поэтому повтор не прибавляет продукт к остатку второй раз. Новые пишутся
+    одним пакетом bulk_log_production; если пакет не прошёл (нехватка ткани у одной записи
+    или параллельная синхронизация того же ключа), — по одной, каждая в своей точке
+    сохранения. Возвращает {client_key: (статус, ошибка)}.
+    """
+    results = {}
+    seen = set(
+        WorkerProductLog.objects.filter(client_key__in=[key for key, *_ in entries])
+        .values_list('client_key', flat=True)
+    )
+    fresh = []
+    for key, worker, product, quantity in entries:
+        if key in seen:
+            results[key] = (DUPLICATE, '')
+        else:
+            seen.add(key)
+            fresh.append((key, (worker, product, quantity)))
+    if not fresh:
+        return results
+
+    try:
+        bulk_log_production([entry for _, entry in fresh], user=user, client_keys=[key for key, _ in fresh])
+    except (MaterialShortage, IntegrityError):
+        for key, entry in fresh:
+            try:
+                bulk_log_production([entry], user=user, client_keys=[key])
+            except MaterialShortage as exc:
+                results[key] = (REJECTED, f"Не хватает материалов: {exc}")
+            except IntegrityError:
+                # дубликатом считаем только ключ, который действительно есть в базе; иначе
+                # (например, продукт удалили параллельно) запись не принята и остаётся у браузера
+                if WorkerProductLog.objects.filter(client_key=key).exists():
+                    results[key] = (DUPLICATE, '')
+                else:
+                    results[key] = (REJECTED, "Запись не сохранена, повторите позже")
+            else:
+                results[key] = (CREATED, '')
+    else:
+        results.update((key, (CREATED, '')) for key, _ in fresh)
+    return results
@@ -0,0 +1,167 @@
+"""
+Профилирование запросов: число SQL-запросов, время SQL, время рендера шаблонов
+и размер ответа по каждому view (см. RequestProfilerMiddleware).
+
+Замеры копятся в памяти процесса и раз в FLUSH_INTERVAL секунд сбрасываются
+в кэш под ключом процесса — страница статистики сводит все процессы вместе.
+"""
+import heapq
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('app.profiling')
+
+SAMPLES = 500            # последних замеров на view в каждом процессе
+WORST_QUERIES = 3
+FLUSH_INTERVAL = 10
+PROCESS_TIMEOUT = 60 * 60
+REGISTRY_KEY = 'profiler:processes'
+METRICS = ('duration', 'queries', 'sql', 'render', 'size')
+
+_current = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Замеры одного запроса; execute_wrapper вызывается на каждый SQL."""
+
+    __slots__ = ('queries', 'sql', 'render', 'render_depth', 'worst')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.render = 0.0
+        self.render_depth = 0
+        self.worst = []  # куча (время, sql) из WORST_QUERIES самых долгих
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.sql += elapsed
+            if len(self.worst) < WORST_QUERIES:
+                heapq.heappush(self.worst, (elapsed, sql))
+            elif elapsed > self.worst[0][0]:
+                heapq.heapreplace(self.worst, (elapsed, sql))
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+
+# --- Время рендера шаблонов -------------------------------------------------
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        # вложенный рендер (render_to_string внутри шаблона) уже учтён внешним
+        profile.render_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.render_depth -= 1
+            if not profile.render_depth:
+                profile.render += time.perf_counter() - start
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """Обычный бэкенд Django-шаблонов, который засекает время render() для профилировщика."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+# --- Накопление и сводка ----------------------------------------------------
+
+# Потоковые воркеры (gthread, runserver) пишут и читают замеры одновременно
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=SAMPLES))
+_last_flush = time.monotonic()
+_process_key = f'profiler:{socket.gethostname()}:{os.getpid()}'
+
+
+def record(view_name, duration, profile, size, path):
+    """Сохранить замер запроса; медленные запросы — в лог вместе с самыми долгими SQL."""
+    global _last_flush
+    now = time.monotonic()
+    with _lock:
+        _samples[view_name].append((duration, profile.queries, profile.sql, profile.render, size))
+        due = now - _last_flush >= FLUSH_INTERVAL
+        if due:
+            _last_flush = now
+
+    if duration * 1000 >= settings.SLOW_REQUEST_MS:
+        worst = "\n".join(
+            f"  {elapsed * 1000:.1f} ms: {sql[:300]}" for elapsed, sql in sorted(profile.worst, reverse=True)
+        )
+        logger.warning(
+            "Медленный запрос %s (%s): %.0f ms, SQL %d шт. / %.0f ms, шаблоны %.0f ms\n%s",
+            path, view_name, duration * 1000, profile.queries, profile.sql * 1000, profile.render * 1000, worst,
+        )
+
+    if due:
+        try:
+            flush()
+        except Exception:  # сбой кэша не должен ронять чужую страницу
+            logger.exception("Не удалось сбросить замеры профилировщика в кэш")
+
+
+def flush():
+    """Сбросить замеры процесса в кэш, чтобы страница статистики видела все процессы."""
+    with _lock:
+        snapshot = {view: list(samples) for view, samples in _samples.items()}
+    cache.set(_process_key, snapshot, PROCESS_TIMEOUT)
+    registry = cache.get(REGISTRY_KEY) or {}
+    registry[_process_key] = time.time()
+    cutoff = time.time() - PROCESS_TIMEOUT
+    cache.set(REGISTRY_KEY, {key: seen for key, seen in registry.items() if seen >= cutoff}, None)
+
+
+def _percentile(values, pct):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def summary():
+    """
+    Сводка по view: [{'view', 'count', 'duration': {50: …, 90: …, 99: …}, ...}],
+    самые медленные (по p90) — первыми. Время — в миллисекундах, размер — в байтах.
+    """
+    flush()
+    registry = cache.get(REGISTRY_KEY) or {}
+    merged = defaultdict(list)
+    for samples in cache.get_many(list(registry)).values():
+        for view, rows in samples.items():
+            merged[view].extend(rows)
+
+    result = []
+    for view, rows in merged.items():
+        item = {'view': view, 'count': len(rows)}
+        for index, metric in enumerate(METRICS):
+            values = sorted(row[index] for row in rows if row[index] is not None)
+            if metric in ('duration', 'sql', 'render'):
+                values = [value * 1000 for value in values]
+            item[metric] = {pct: _percentile(values, pct) for pct in (50, 90, 99)} if values else None
+        result.append(item)
+    return sorted(result, key=lambda item: -item['duration'][90])
@@ -0,0 +1,62 @@
+"""
+Планы запросов горячих view: EXPLAIN каждого SELECT, который выполняет view,
+и поиск полного просмотра больших таблиц — журналов и логов, растущих без
+ограничений. Справочники (ткани, продукты, пользователи) читаются целиком
+намеренно: дашборды показывают их все.
+"""
+import json
+import re
+
+from .models import (
+    FabricChangeLog, MaterialTransaction, ProductTransaction, StockSnapshot, WorkerProductLog,
+)
+
+LARGE_TABLES = {
+    model._meta.db_table
+    for model in (WorkerProductLog, MaterialTransaction, ProductTransaction, FabricChangeLog, StockSnapshot)
+}
+
+# Django ссылается на таблицы подзапросов через алиасы: FROM "app_x" U0
+_ALIAS = re.compile(r'"(\w+)"\s+(?:AS\s+)?"?([A-Z]\d+)"?\b')
+_SQLITE_SCAN = re.compile(r'^SCAN (\S+)')
+
+
+def _sqlite_full_scans(cursor, sql):
+    aliases = {alias: table for table, alias in _ALIAS.findall(sql)}
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+    scans = []
+    for *_, detail in cursor.fetchall():
+        match = _SQLITE_SCAN.match(detail)
+        if match:
+            table = aliases.get(match.group(1), match.group(1))
+            if table in LARGE_TABLES:
+                scans.append(f"{table}: {detail}")
+    return scans
+
+
+def _postgresql_full_scans(cursor, sql):
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans, nodes = [], [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', ()))
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in LARGE_TABLES:
+            scans.append(f"{node['Relation Name']}: Seq Scan (rows≈{node.get('Plan Rows')})")
+    return scans
+
+
+EXPLAINERS = {
+    'sqlite': _sqlite_full_scans,
+    'postgresql': _postgresql_full_scans,
+}
+
+
+def full_scans(connection, sql):
+    """Полные просмотры больших таблиц в плане sql: ['таблица: узел плана', ...]."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return []
+    with connection.cursor() as cursor:
+        return EXPLAINERS[connection.vendor](cursor, sql)
@@ -0,0 +1,147 @@
+"""
+Отчёт о выработке работников: количество и сдельный заработок
+по работнику, продукту и периоду (день / неделя / месяц).
+
+Считается GROUP BY-запросом по индексу (worker, date). Закрытые периоды
+(закончились до сегодняшнего дня) больше не меняются и кэшируются каждый
+отдельно; текущий период всегда считается заново.
+"""
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils.timezone import localdate
+
+from .models import WorkerProductLog
+
+BUCKETS = {
+    # date — DateField, поэтому день берём TruncDay (TruncDate — только для DateTimeField)
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+MAX_PERIODS = 400
+PERIOD_TIMEOUT = 60 * 60 * 24 * 30
+VERSION_KEY = 'productivity:version'
+MONEY = DecimalField(max_digits=20, decimal_places=2)
+
+
+def period_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(weeks=1)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def periods(date_from, date_to, bucket):
+    """Начала всех периодов, пересекающих [date_from, date_to] (не больше MAX_PERIODS)."""
+    result = []
+    start = period_start(date_from, bucket)
+    while start <= date_to and len(result) < MAX_PERIODS:
+        result.append(start)
+        start = next_period(start, bucket)
+    return result
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate():
+    """Сбросить кэш закрытых периодов (после коммита): логи прошлого изменены/удалены, сменилась цена или имя."""
+    # новый уникальный токен, а не incr: у файлового кэша incr — get + set и теряется при гонке
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def _query(date_from, date_to, bucket):
+    """Строки отчёта за [date_from, date_to) одним GROUP BY: {начало периода: [строки]}."""
+    rows = (
+        WorkerProductLog.objects
+        .filter(date__gte=date_from, date__lt=date_to)
+        .annotate(period=BUCKETS[bucket]('date'))
+        .values('period', 'worker_id', 'worker__username', 'product_id', 'product_name')
+        .annotate(
+            total=Sum('quantity'),
+            # сдельная оплата по текущей цене продукта; у удалённого продукта — 0
+            earnings=Coalesce(
+                Sum(ExpressionWrapper(F('quantity') * F('product__price_per_unit'), output_field=MONEY)),
+                Value(Decimal('0')), output_field=MONEY,
+            ),
+        )
+        .order_by('period', 'worker__username', 'product_name')
+    )
+    result = defaultdict(list)
+    for row in rows:
+        result[row['period']].append({
+            'period': row['period'],
+            'worker_id': row['worker_id'],
+            'worker': row['worker__username'],
+            'product_id': row['product_id'],
+            'product': row['product_name'],
+            'quantity': row['total'],
+            'earnings': row['earnings'],
+        })
+    return result
+
+
+def productivity(date_from, date_to, bucket='week', worker_id=None):
+    """
+    Строки отчёта за периоды, пересекающие [date_from, date_to], по порядку периодов.
+
+    Закрытые периоды берутся из кэша; всё недостающее (и текущий период) читается
+    одним запросом по диапазону от первого до последнего такого периода.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(bucket)
+    starts = periods(date_from, date_to, bucket)
+    if not starts:
+        return []
+
+    today = localdate()
+    version = _version()
+    keys = {start: f'productivity:{version}:{bucket}:{start.isoformat()}' for start in starts}
+    closed = {start for start in starts if next_period(start, bucket) <= today}
+
+    found = cache.get_many([keys[start] for start in closed])
+    data = {start: found[keys[start]] for start in closed if keys[start] in found}
+    missing = [start for start in starts if start not in data]
+    if missing:
+        fresh = _query(missing[0], next_period(missing[-1], bucket), bucket)
+        cache.set_many({keys[start]: fresh.get(start, []) for start in missing if start in closed},
+                       PERIOD_TIMEOUT)
+        data.update({start: fresh.get(start, []) for start in missing})
+
+    rows = [row for start in starts for row in data[start]]
+    if worker_id is not None:
+        rows = [row for row in rows if row['worker_id'] == worker_id]
+    return rows
+
+
+def worker_totals(rows):
+    """Итоги по работникам за весь отчёт: [{'worker', 'quantity', 'earnings'}], по убыванию выработки."""
+    totals = {}
+    for row in rows:
+        item = totals.setdefault(row['worker_id'], {
+            'worker_id': row['worker_id'], 'worker': row['worker'], 'quantity': 0, 'earnings': Decimal('0'),
+        })
+        item['quantity'] += row['quantity']
+        item['earnings'] += row['earnings']
+    return sorted(totals.values(), key=lambda item: (-item['quantity'], item['worker']))
@@ -1,7 +1,45 @@
 from decimal import Decimal
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models import F, Sum, Max
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
 from django.dispatch import receiver
-from .models import WorkerProductLog, Product, ProductTransaction
+from .decorators import forget_roles
+from .models import (
+    WorkerProductLog, Product, ProductProductionStats, MaterialForProduct, ProductType,
+    Fabric, MaterialTransaction, ProductTransaction,
+)
+from . import dashboard, reports
+from .planning import invalidate_matrix
+from .stock import shift_quantity
+
+
+# --- Сводка производства (ProductProductionStats) ---
+def stats_add(product_id, quantity, date):
+    """Прибавить новый лог к сводке продукта без пересчёта всей таблицы логов."""
+    stats, created = ProductProductionStats.objects.get_or_create(
+        product_id=product_id,
+        defaults={'total_qty': quantity, 'last_date': date},
+    )
+    if created:
+        return
+    ProductProductionStats.objects.filter(product_id=product_id).update(
+        total_qty=F('total_qty') + quantity
+    )
+    if date and (stats.last_date is None or date > stats.last_date):
+        ProductProductionStats.objects.filter(product_id=product_id).update(last_date=date)
+
+
+def stats_refresh(product_id):
+    """Пересчитать сводку одного продукта (после удаления/переноса лога)."""
+    if not Product.objects.filter(pk=product_id).exists():
+        return
+    agg = WorkerProductLog.objects.filter(product_id=product_id).aggregate(
+        total=Sum('quantity'), last=Max('date')
+    )
+    ProductProductionStats.objects.update_or_create(
+        product_id=product_id,
+        defaults={'total_qty': agg['total'] or 0, 'last_date': agg['last']},
+    )
 
 
 # --- Если лог меняют (редактируют), нужно знать старое значение ---
@@ -27,50 +65,100 @@ def worker_log_post_save(sender, instance, created, **kwargs):
     created -> новое производство
     updated -> изменить остаток на разницу
     """
-    if not instance.product:
-        return
+    old_product_id = getattr(instance, '_old_product_id', None)
+    if created:
+        if instance.product_id:
+            stats_add(instance.product_id, instance.quantity, instance.date)
+    else:
+        for product_id in {old_product_id, instance.product_id} - {None}:
+            stats_refresh(product_id)
 
-    product = Product.objects.select_for_update().get(pk=instance.product.pk)
+    if not instance.product_id:
+        return
 
+    # Остаток меняем атомарным UPDATE (quantity = quantity + delta), не обходя значение через Python
     if created:
-        product.quantity = (product.quantity or Decimal('0')) + Decimal(instance.quantity)
+        shift_quantity(Product, instance.product_id, instance.quantity, clamp=True)
     else:
         # Изменили лог
         old_qty = getattr(instance, '_old_quantity', None)
-        old_product_id = getattr(instance, '_old_product_id', None)
 
         if old_product_id and old_product_id != instance.product_id:
             # Перенесли лог с одного продукта на другой
             try:
-                old_product = Product.objects.select_for_update().get(pk=old_product_id)
-                old_product.quantity = (old_product.quantity or Decimal('0')) - Decimal(old_qty or 0)
-                if old_product.quantity < 0:
-                    old_product.quantity = 0
-                old_product.save(update_fields=['quantity'])
+                shift_quantity(Product, old_product_id, -Decimal(old_qty or 0), clamp=True)
             except Product.DoesNotExist:
                 pass
             # Для нового продукта просто прибавляем полное количество
-            product.quantity = (product.quantity or Decimal('0')) + Decimal(instance.quantity)
-        else:
-            if old_qty is not None and old_qty != instance.quantity:
-                diff = Decimal(instance.quantity) - Decimal(old_qty)
-                product.quantity = (product.quantity or Decimal('0')) + diff
-
-    if product.quantity < 0:
-        product.quantity = 0
-
-    product.save(update_fields=['quantity'])
+            shift_quantity(Product, instance.product_id, instance.quantity, clamp=True)
+        elif old_qty is not None and old_qty != instance.quantity:
+            diff = Decimal(instance.quantity) - Decimal(old_qty)
+            shift_quantity(Product, instance.product_id, diff, clamp=True)
 
 
 @receiver(post_delete, sender=WorkerProductLog)
 def worker_log_post_delete(sender, instance, **kwargs):
-    if not instance.product:
+    if not instance.product_id:
         return
+    stats_refresh(instance.product_id)
     try:
-        product = Product.objects.select_for_update().get(pk=instance.product.pk)
+        shift_quantity(Product, instance.product_id, -Decimal(instance.quantity), clamp=True)
     except Product.DoesNotExist:
         return
-    product.quantity = (product.quantity or Decimal('0')) - Decimal(instance.quantity)
-    if product.quantity < 0:
-        product.quantity = 0
-    product.save(update_fields=['quantity'])
+
+
+# --- Роли: сбрасываем кэш при изменении групп пользователя ---
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # group.user_set.add(...) / clear(): затронуты пользователи из pk_set (или все в группе)
+        user_ids = pk_set if pk_set is not None else instance.user_set.values_list('pk', flat=True)
+        forget_roles(*user_ids)
+    else:
+        instance.__dict__.pop('_roles_cache', None)
+        forget_roles(instance.pk)
+    dashboard.bump('users')
+
+
+# --- Рецепты (BOM): сбрасываем закэшированную матрицу при любом изменении ---
+@receiver([post_save, post_delete], sender=MaterialForProduct)
+@receiver([post_save, post_delete], sender=ProductType)
+@receiver([post_save, post_delete], sender=Product)
+def bom_changed(sender, **kwargs):
+    invalidate_matrix()
+
+
+# --- Дашборд: новая версия закэшированных блоков при изменении данных ---
+@receiver([post_save, post_delete], sender=Fabric)
+@receiver([post_save, post_delete], sender=MaterialTransaction)
+def fabrics_changed(sender, **kwargs):
+    dashboard.bump('fabrics')
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductTransaction)
+@receiver([post_save, post_delete], sender=WorkerProductLog)
+def products_changed(sender, **kwargs):
+    dashboard.bump('products')
+
+
+@receiver([post_save, post_delete], sender=User)
+def users_changed(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return  # вход пользователя списки не меняет
+    dashboard.bump('users')
+    reports.invalidate()  # имя работника в закэшированных отчётах
+
+
+# --- Отчёт о выработке: закрытые периоды меняются только при правке прошлого ---
+@receiver([post_save, post_delete], sender=WorkerProductLog)
+def worker_log_report_changed(sender, created=False, **kwargs):
+    if not created:
+        reports.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_report_changed(sender, **kwargs):
+    reports.invalidate()  # цена за единицу и название продукта
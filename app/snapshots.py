@@ -0,0 +1,134 @@
+"""
+Остатки склада на произвольный момент времени.
+
+Опорные точки — снимки StockSnapshot (команда snapshot_stock) и текущие остатки.
+Остаток на момент t = ближайший снимок не позже t + движения (t_снимка, t];
+для позиций без такого снимка — ближайший более поздний снимок (или текущий
+остаток) минус движения (t, t_опоры]. Журнал группируется одним запросом на
+таблицу, поэтому отчёт не перебирает историю построчно.
+
+Выпуск продукции (WorkerProductLog) тоже меняет остаток продукта, но хранит
+только дату, поэтому учитывается с точностью до дня.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from .models import (
+    Fabric, MaterialTransaction, Product, ProductTransaction, StockSnapshot, WorkerProductLog,
+)
+from .pagination import signed_amount
+
+KINDS = {
+    # вид снимка → (модель, журнал движений, FK журнала)
+    StockSnapshot.FABRIC: (Fabric, MaterialTransaction, 'fabric'),
+    StockSnapshot.PRODUCT: (Product, ProductTransaction, 'product'),
+}
+BATCH_SIZE = 1000
+
+
+def take_snapshot(taken_at=None):
+    """Снять остатки всех тканей и продуктов одной пачкой; возвращает число строк."""
+    taken_at = taken_at or timezone.now()
+    with transaction.atomic():
+        rows = [
+            StockSnapshot(kind=kind, item_id=pk, quantity=quantity, taken_at=taken_at)
+            for kind, (model, _, _) in KINDS.items()
+            for pk, quantity in model.objects.values_list('pk', 'quantity')
+        ]
+        StockSnapshot.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def ledger_delta(kind, start=None, end=None, item_ids=None):
+    """
+    Изменение остатка по позициям за (start, end]: {item_id: сумма со знаком}.
+    Без границ — по всей истории; item_ids — только эти позиции. Один GROUP BY на таблицу.
+    """
+    _, ledger, fk = KINDS[kind]
+    delta = defaultdict(Decimal)
+    moves = ledger.objects.all()
+    if item_ids is not None:
+        moves = moves.filter(**{f'{fk}__in': item_ids})
+    if start:
+        moves = moves.filter(created_at__gt=start)
+    if end:
+        moves = moves.filter(created_at__lte=end)
+    moves = moves.values(fk).annotate(total=Sum(signed_amount())).values_list(fk, 'total').order_by()
+    for item_id, total in moves.iterator():
+        delta[item_id] += total
+    if kind == StockSnapshot.PRODUCT:
+        produced = WorkerProductLog.objects.filter(product__isnull=False)
+        if item_ids is not None:
+            produced = produced.filter(product__in=item_ids)
+        if start:
+            produced = produced.filter(date__gt=timezone.localdate(start))
+        if end:
+            produced = produced.filter(date__lte=timezone.localdate(end))
+        produced = produced.values('product').annotate(total=Sum('quantity')).values_list('product', 'total').order_by()
+        for item_id, total in produced.iterator():
+            delta[item_id] += total
+    return delta
+
+
+def _snapshot(kind, taken_at):
+    return dict(StockSnapshot.objects.filter(kind=kind, taken_at=taken_at).values_list('item_id', 'quantity'))
+
+
+def balances_at(kind, at):
+    """
+    Остатки всех позиций вида kind на момент at: {item_id: Decimal}.
+    Позиции, созданные позже at, в результат не попадают.
+    """
+    model, _, _ = KINDS[kind]
+    current = dict(model.objects.filter(created_at__lte=at).values_list('pk', 'quantity'))
+    now = timezone.now()
+    if at >= now:
+        return current
+
+    result = {}
+    snapshots = StockSnapshot.objects.filter(kind=kind)
+
+    # вперёд от ближайшего снимка не позже at
+    before = snapshots.filter(taken_at__lte=at).aggregate(t=Max('taken_at'))['t']
+    if before:
+        base = _snapshot(kind, before)
+        delta = ledger_delta(kind, before, at)
+        result = {pk: base[pk] + delta.get(pk, 0) for pk in current if pk in base}
+
+    # назад от ближайшего более позднего снимка, а если его нет — от текущих остатков
+    rest = [pk for pk in current if pk not in result]
+    if rest:
+        after = snapshots.filter(taken_at__gt=at).aggregate(t=Min('taken_at'))['t']
+        base = _snapshot(kind, after) if after else {}
+        if any(pk in base for pk in rest):
+            delta = ledger_delta(kind, at, after)
+            result.update({pk: base[pk] - delta.get(pk, 0) for pk in rest if pk in base})
+        rest = [pk for pk in rest if pk not in result]
+        if rest:
+            delta = ledger_delta(kind, at, now)
+            result.update({pk: current[pk] - delta.get(pk, 0) for pk in rest})
+    return result
+
+
+def stock_at(at):
+    """Остатки тканей и продуктов на момент at для отчёта: {kind: [строки]}."""
+    report = {}
+    for kind, (model, _, _) in KINDS.items():
+        balances = balances_at(kind, at)
+        items = model.objects.only('pk', 'name', 'unit', 'quantity').order_by('name')
+        report[kind] = [
+            {
+                'id': item.pk,
+                'name': item.name,
+                'unit': item.get_unit_display(),
+                'quantity': balances[item.pk],
+                'current': item.quantity,
+            }
+            for item in items
+            if item.pk in balances
+        ]
+    return report
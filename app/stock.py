@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from . import alerts, dashboard
+from .models import Fabric, Product, MaterialTransaction, ProductTransaction
+
+
+class InsufficientStock(Exception):
+    """Движение отклонено: остаток вышел бы за допустимые границы."""
+
+    def __init__(self, available):
+        self.available = available
+        super().__init__(f"Доступно только {available}.")
+
+
+def shift_quantity(model, pk, delta, floor=Decimal('0'), clamp=False):
+    """
+    Атомарно изменить model.quantity на delta одним условным UPDATE:
+
+        UPDATE ... SET quantity = quantity + delta
+        WHERE pk = ... AND quantity + delta >= floor
+
+    Значение не читается в Python заранее, поэтому параллельные движения не теряются.
+    clamp=True — не отказывать, а обрезать результат по floor (как раньше делали сигналы).
+    Возвращает новый остаток; если он ушёл бы ниже floor, бросает InsufficientStock.
+    """
+    delta = Decimal(delta)
+    rows = model.objects.filter(pk=pk)
+
+    if clamp:
+        updated = rows.update(quantity=Greatest(F('quantity') + delta, Value(floor)))
+    else:
+        conditional = rows
+        if floor is not None and delta < 0:
+            conditional = conditional.filter(quantity__gte=floor - delta)
+        updated = conditional.update(quantity=F('quantity') + delta)
+
+    balance = rows.values_list('quantity', flat=True).first()
+    if balance is None:
+        raise model.DoesNotExist
+    if not updated:
+        raise InsufficientStock(balance)
+
+    # после коммита панель низких остатков пересчитается при следующем показе
+    transaction.on_commit(alerts.invalidate)
+    dashboard.bump('fabrics' if model is Fabric else 'products')
+    return balance
+
+
+def move_fabric(fabric, amount, transaction_type, user=None, note=''):
+    """Приход/расход ткани + запись MaterialTransaction в одной транзакции.
+    Возвращает созданную запись; новый остаток — в её атрибуте .balance."""
+    delta = amount if transaction_type == MaterialTransaction.IN else -amount
+    with transaction.atomic():
+        balance = shift_quantity(Fabric, fabric.pk, delta)
+        entry = MaterialTransaction.objects.create(
+            fabric_id=fabric.pk,
+            user=user,
+            transaction_type=transaction_type,
+            amount=amount,
+            note=note,
+        )
+    entry.balance = balance
+    return entry
+
+
+def move_product(product, amount, transaction_type, user=None, note=''):
+    """Приход/расход продукта + запись ProductTransaction (с .balance, как move_fabric)."""
+    delta = amount if transaction_type == ProductTransaction.IN else -amount
+    with transaction.atomic():
+        balance = shift_quantity(Product, product.pk, delta)
+        entry = ProductTransaction.objects.create(
+            product_id=product.pk,
+            user=user,
+            transaction_type=transaction_type,
+            amount=amount,
+            note=note,
+        )
+    entry.balance = balance
+    return entry
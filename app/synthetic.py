@@ -0,0 +1,177 @@
+"""
+Синтетические данные для нагрузочных замеров (команды generate_data и run_benchmarks).
+
+Всё создаётся bulk_create пачками; остатки в конце выставляются по журналу,
+так что reconcile_stock на сгенерированной базе расхождений не находит.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import (
+    Fabric, MaterialForProduct, MaterialTransaction, Product, ProductProductionStats, ProductTransaction,
+    ProductType, WorkerProductLog,
+)
+from .snapshots import ledger_delta
+
+BATCH_SIZE = 2000
+PASSWORD = 'bench-password'
+HISTORY_DAYS = 365
+
+SCALES = {
+    'small': {'fabrics': 20, 'products': 20, 'workers': 10, 'logs': 2_000, 'transactions': 2_000},
+    'medium': {'fabrics': 100, 'products': 100, 'workers': 50, 'logs': 20_000, 'transactions': 20_000},
+    'large': {'fabrics': 500, 'products': 300, 'workers': 200, 'logs': 200_000, 'transactions': 200_000},
+}
+
+
+def _spread(rng, now):
+    """Случайный момент за последние HISTORY_DAYS дней."""
+    return now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 3600))
+
+
+@transaction.atomic
+def generate(fabrics, products, workers, logs, transactions, seed=0, prefix='bench'):
+    """
+    Создать fabrics тканей, products продуктов (с рецептами), workers работников,
+    logs логов производства и transactions движений по каждому журналу.
+    Возвращает словарь созданных количеств.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(PASSWORD)
+
+    admin = User.objects.create(username=f'{prefix}-admin', password=password)
+    admin.groups.add(Group.objects.get_or_create(name='admin')[0])
+    superuser = User.objects.create(
+        username=f'{prefix}-root', password=password, is_superuser=True, is_staff=True,
+    )
+    worker_group = Group.objects.get_or_create(name='worker')[0]
+    worker_objs = User.objects.bulk_create(
+        [User(username=f'{prefix}-worker-{i}', password=password) for i in range(workers)],
+        batch_size=BATCH_SIZE,
+    )
+    worker_group.user_set.add(*worker_objs)
+
+    fabric_objs = Fabric.objects.bulk_create(
+        [
+            Fabric(
+                name=f'{prefix} fabric {i}',
+                price=Decimal(rng.randrange(500, 50_000)) / 100,
+                unit=rng.choice(('kg', 'm', 'pcs')),
+                reorder_point=Decimal(rng.randrange(0, 50)),
+            )
+            for i in range(fabrics)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    types = ProductType.objects.bulk_create(
+        [ProductType(name=f'{prefix} type {i}') for i in range(max(1, products // 5))]
+    )
+    MaterialForProduct.objects.bulk_create(
+        [
+            MaterialForProduct(product_type=product_type, fabric=fabric, quantity=rng.randrange(1, 20) / 10)
+            for product_type in types
+            for fabric in rng.sample(fabric_objs, min(3, len(fabric_objs)))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    product_objs = Product.objects.bulk_create(
+        [
+            Product(
+                name=f'{prefix} product {i}',
+                price_per_unit=Decimal(rng.randrange(1_000, 100_000)) / 100,
+                product_type=rng.choice(types),
+            )
+            for i in range(products)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    # Логи производства: дата — после вставки (auto_now_add подставляет сегодняшнюю)
+    if worker_objs and product_objs:
+        created = WorkerProductLog.objects.bulk_create(
+            [
+                WorkerProductLog(
+                    worker=rng.choice(worker_objs), product=product, product_name=product.name,
+                    quantity=rng.randrange(1, 50),
+                )
+                for product in (rng.choice(product_objs) for _ in range(logs))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        for log in created:
+            log.date = _spread(rng, now).date()
+        WorkerProductLog.objects.bulk_update(created, ['date'], batch_size=BATCH_SIZE)
+
+    # Движения: по тканям приходов больше, чем расходов; по продуктам — в основном отгрузки
+    if fabric_objs:
+        _ledger(rng, now, MaterialTransaction, 'fabric', fabric_objs, transactions, in_share=0.6, user=admin)
+    if product_objs:
+        _ledger(rng, now, ProductTransaction, 'product', product_objs, transactions, in_share=0.2, user=admin)
+
+    _settle_balances(fabric_objs, product_objs, now - timedelta(days=HISTORY_DAYS))
+    return {
+        'fabrics': len(fabric_objs), 'products': len(product_objs), 'workers': len(worker_objs),
+        'logs': logs if worker_objs and product_objs else 0, 'transactions': transactions,
+        'admin': admin.username, 'superuser': superuser.username,
+    }
+
+
+def _ledger(rng, now, model, fk, items, count, in_share, user):
+    created = model.objects.bulk_create(
+        [
+            model(**{
+                fk: rng.choice(items),
+                'user': user,
+                'transaction_type': model.IN if rng.random() < in_share else model.OUT,
+                'amount': Decimal(rng.randrange(100, 10_000)) / 100,
+                'note': 'synthetic',
+            })
+            for _ in range(count)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    for row in created:
+        row.created_at = _spread(rng, now)
+    model.objects.bulk_update(created, ['created_at'], batch_size=BATCH_SIZE)
+
+
+def _settle_balances(fabric_objs, product_objs, opened_at):
+    """
+    Остатки созданных позиций = сумма их журнала (не ниже нуля — недостающее
+    дописывается начальным приходом) и сводка производства.
+    """
+    for kind, model, items, ledger, fk in (
+        ('fabric', Fabric, fabric_objs, MaterialTransaction, 'fabric'),
+        ('product', Product, product_objs, ProductTransaction, 'product'),
+    ):
+        expected = ledger_delta(kind)
+        opening = [
+            ledger(**{fk: item, 'transaction_type': ledger.IN, 'amount': -expected[item.pk],
+                      'note': 'synthetic opening'})
+            for item in items if expected.get(item.pk, 0) < 0
+        ]
+        for row in ledger.objects.bulk_create(opening, batch_size=BATCH_SIZE):
+            row.created_at = opened_at
+        ledger.objects.bulk_update(opening, ['created_at'], batch_size=BATCH_SIZE)
+        for item in items:
+            item.quantity = max(expected.get(item.pk, Decimal('0')), Decimal('0'))
+        model.objects.bulk_update(items, ['quantity'], batch_size=BATCH_SIZE)
+
+    stats = (
+        WorkerProductLog.objects.filter(product__in=product_objs)
+        .values('product').annotate(total_qty=Sum('quantity'), last_date=Max('date')).order_by()
+    )
+    ProductProductionStats.objects.bulk_create(
+        [ProductProductionStats(product_id=row['product'], total_qty=row['total_qty'], last_date=row['last_date'])
+         for row in stats],
+        batch_size=BATCH_SIZE,
+    )
@@ -0,0 +1,70 @@
+"""
+Фоновые задачи (app.jobs): тяжёлые операции, вынесенные из запросов.
+Приоритет: то, чего пользователь ждёт на странице задачи, — выше служебного.
+"""
+import tempfile
+from datetime import date
+from io import StringIO
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+
+from . import dashboard, exports, jobs
+from .images import build_renditions, mark_renditions
+
+EXPORT_ROOT = 'exports'
+OUTPUT_LIMIT = 20_000  # символов вывода команды в результате задачи
+
+# Служебные команды, которые суперпользователь может запустить со страницы задач
+MAINTENANCE_COMMANDS = {
+    'reconcile_stock': "Qoldiqlarni jurnal bilan solishtirish",
+    'snapshot_stock': "Qoldiqlar surati",
+    'check_stock_levels': "Kam qoldiqlarni tekshirish",
+    'rebuild_production_stats': "Ishlab chiqarish statistikasini qayta hisoblash",
+}
+
+
+@jobs.task(priority=5)
+def build_image_renditions(model, pk):
+    """Нарезать копии изображения ткани или продукта; model — 'app.fabric' / 'app.product'."""
+    obj = apps.get_model(model).objects.filter(pk=pk).only('pk', 'image').first()
+    if obj is None or not obj.image:
+        return 0
+    built = build_renditions(obj.image, force=True)
+    mark_renditions(obj)
+    # разделы панели уже сброшены при сохранении — тогда копий ещё не было, и в кэше остались оригиналы
+    dashboard.bump('fabrics' if model == 'app.fabric' else 'products')
+    return built
+
+
+def _date(value):
+    return date.fromisoformat(value) if value else None
+
+
+@jobs.task(priority=10, max_attempts=2)
+def export_ledger_file(kind, fmt, date_from=None, date_to=None, item=None, transaction_type=None):
+    """Выгрузка журнала в файл MEDIA/exports/ вместо потокового ответа; результат — имя и ссылка."""
+    chunks = exports.export(
+        kind, fmt, date_from=_date(date_from), date_to=_date(date_to), item=item, transaction_type=transaction_type,
+    )
+    with tempfile.TemporaryFile() as fh:
+        for chunk in chunks:
+            fh.write(chunk)
+        fh.seek(0)
+        name = default_storage.save(
+            f'{EXPORT_ROOT}/{kind}_ledger_{timezone.now():%Y%m%d_%H%M%S}.{fmt}', File(fh),
+        )
+    return {'name': name, 'url': default_storage.url(name)}
+
+
+@jobs.task(priority=-5, max_attempts=1)
+def run_command(name, *args):
+    """Служебная команда из MAINTENANCE_COMMANDS; результат — её вывод."""
+    if name not in MAINTENANCE_COMMANDS:
+        raise ValueError(f"Команда {name} не разрешена для фонового запуска.")
+    output = StringIO()
+    call_command(name, *args, stdout=output, stderr=output)
+    return output.getvalue()[-OUTPUT_LIMIT:]
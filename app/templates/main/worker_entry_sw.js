@@ -0,0 +1,53 @@
+// Service worker страницы ввода (worker_entry): страница и её оформление — из кэша, когда сети нет.
+// Данные сюда не попадают: очередь записей живёт в IndexedDB самой страницы.
+const CACHE = 'worker-entry-v1';
+const PAGE_URL = "{% url 'worker_entry' %}";
+
+self.addEventListener('install', (event) => {
+  event.waitUntil(caches.open(CACHE).then((cache) => cache.add(PAGE_URL)).catch(() => {}));
+  self.skipWaiting();
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil(
+    caches.keys()
+      .then((keys) => Promise.all(keys.filter((key) => key !== CACHE).map((key) => caches.delete(key))))
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  if (request.method !== 'GET') return;  // синхронизация идёт мимо кэша
+
+  if (request.mode === 'navigate') {
+    // страница: сначала сеть (свежий список продуктов), без сети — последняя сохранённая копия
+    event.respondWith(
+      fetch(request)
+        .then((response) => {
+          if (response.ok && !response.redirected) {
+            const copy = response.clone();
+            caches.open(CACHE).then((cache) => cache.put(PAGE_URL, copy));
+          }
+          return response;
+        })
+        .catch(() => caches.match(PAGE_URL))
+    );
+    return;
+  }
+
+  if (['style', 'script', 'image'].includes(request.destination)) {
+    // Bootstrap и логотип: из кэша, в фоне — обновить
+    event.respondWith(
+      caches.open(CACHE).then((cache) => cache.match(request).then((cached) => {
+        const network = fetch(request)
+          .then((response) => {
+            if (response.ok || response.type === 'opaque') cache.put(request, response.clone());
+            return response;
+          })
+          .catch(() => cached);
+        return cached || network;
+      }))
+    );
+  }
+});
@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from app.images import RENDITIONS, rendition_name, rendition_srcset, renditions_ready
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image_field, rendition='card', alt='', css_class='', style=''):
+    """
+    {% responsive_image fabric.image 'card' alt=fabric.name css_class='card-img-top' %}
+
+    Выводит <picture> с WebP/JPEG копиями 1x/2x. Если копии ещё не нарезаны (задача
+    в очереди у run_worker) — обычный <img> на оригинал. Готовность берётся из поля
+    image_renditions объекта: хранилище на каждый рендер не опрашивается.
+    """
+    if not image_field:
+        return ''
+
+    if not renditions_ready(image_field):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="lazy">',
+            image_field.url, alt, css_class, style,
+        )
+
+    width, height = RENDITIONS[rendition]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" width="{}" height="{}" alt="{}" class="{}" style="{}" loading="lazy">'
+        '</picture>',
+        rendition_srcset(image_field, rendition, 'webp'),
+        default_storage.url(rendition_name(image_field.name, rendition, 1, 'jpg')),
+        rendition_srcset(image_field, rendition, 'jpg'),
+        width, height, alt, css_class, style,
+    )
@@ -1,3 +1,589 @@
-from django.test import TestCase
+import json
+import os
+import signal
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import alerts, benchmark, dashboard, jobs, planning, production, profiling, synthetic, tasks
+from .benchmark import BENCH_CACHES
+from .models import (
+    Fabric, FabricChangeLog, Job, MaterialForProduct, MaterialTransaction, Product, ProductTransaction, ProductType,
+    WorkerProductLog,
+)
+from .management.commands.reconcile_stock import ADJUSTMENT_NOTE, Command as ReconcileCommand
+from .production import log_production
+from .snapshots import ledger_delta
+from .stock import move_fabric, move_product
+
+TINY = {'fabrics': 4, 'products': 4, 'workers': 2, 'logs': 40, 'transactions': 40}
+
+
+@override_settings(CACHES=BENCH_CACHES)
+class BenchmarkSmokeTests(TestCase):
+    def test_generated_balances_match_ledger(self):
+        synthetic.generate(**TINY)
+        for kind, model in (('fabric', Fabric), ('product', Product)):
+            expected = ledger_delta(kind)
+            for pk, quantity in model.objects.values_list('pk', 'quantity'):
+                # SQLite суммирует через float — сравниваем с точностью до копейки, как reconcile_stock
+                self.assertEqual(quantity, Decimal(expected.get(pk, 0)).quantize(Decimal('0.01')))
+
+    def test_scenarios_respond(self):
+        result = benchmark.run(TINY, iterations=1)
+        for name, row in result['scenarios'].items():
+            self.assertIn(row['status'], (200, 302), name)
+
+
+@override_settings(CACHES=BENCH_CACHES)
+class ProductStockTests(TestCase):
+    """Произведённое попадает в Product.quantity один раз: карточка и приход его не досчитывают."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('stock-admin', password='stock-password')
+        cls.admin.groups.add(Group.objects.get(name='admin'))
+        worker = User.objects.create_user('stock-worker', password='stock-password')
+        product_type = ProductType.objects.create(name='stock type')
+        cls.product = Product.objects.create(name='stock product', price_per_unit=2, product_type=product_type)
+        log_production(worker, cls.product, 10)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_view_product(self):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 10)
+        response = self.client.get(reverse('view_product', args=[self.product.pk]))
+        self.assertEqual((response.context['total_qty'], response.context['current_qty']), (10, 10))
+        self.assertEqual(response.context['stock_value'], 20)
+
+    def test_products_in(self):
+        response = self.client.post(reverse('product_in', args=[self.product.pk]), {'value': '5'})
+        self.assertRedirects(response, reverse('product_history', args=[self.product.pk]))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 15)
+
+
+@override_settings(CACHES=BENCH_CACHES, LOW_STOCK_WINDOW_DAYS=30, LOW_STOCK_HORIZON_DAYS=7)
+class LowStockTests(TestCase):
+    def test_usage_threshold_is_not_truncated(self):
+        # 29 за 30 дней: на 7 дней нужно 6.77, а есть 6
+        fabric = Fabric.objects.create(name='alert fabric', quantity=6)
+        MaterialTransaction.objects.create(fabric=fabric, transaction_type=MaterialTransaction.OUT, amount=29)
+        self.assertIn(f'fabric:{fabric.pk}', alerts.sweep())
+
+    def test_movement_during_sweep_is_not_lost(self):
+        fabric = Fabric.objects.create(name='race fabric', quantity=10, reorder_point=5)
+        self.assertEqual(alerts.current_alerts(), [])
+        real_low_stock = alerts._low_stock
+
+        def low_stock_with_concurrent_move(*args):
+            # пока sweep читает остатки, другой процесс списывает ткань
+            rows = list(real_low_stock(*args))
+            if args[0] is Fabric:
+                with self.captureOnCommitCallbacks(execute=True):
+                    move_fabric(fabric, Decimal('8'), MaterialTransaction.OUT)
+            return rows
+
+        alerts.invalidate()
+        with mock.patch.object(alerts, '_low_stock', side_effect=low_stock_with_concurrent_move):
+            alerts.current_alerts()
+        self.assertEqual([a['pk'] for a in alerts.current_alerts()], [fabric.pk])
+
+    def test_add_product_rejects_bad_reorder_point(self):
+        admin = User.objects.create_user('alert-admin')
+        admin.groups.add(Group.objects.get(name='admin'))
+        self.client.force_login(admin)
+        response = self.client.post(reverse('add_product'), {'name': 'alert product', 'reorder_point': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Product.objects.filter(name='alert product').exists())
+        response = self.client.post(reverse('add_product'), {'name': 'alert product', 'reorder_point': '3'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(Product.objects.get(name='alert product').reorder_point, 3)
+
+
+class ReconcileStockTests(TestCase):
+    def test_repair_rechecks_drift(self):
+        settled = Fabric.objects.create(name='reconcile settled')
+        move_fabric(settled, Decimal('5'), MaterialTransaction.IN)
+        drifted = Fabric.objects.create(name='reconcile drifted')
+        Fabric.objects.filter(pk=drifted.pk).update(quantity=3)
+        command = ReconcileCommand(stdout=StringIO())
+        # первую позицию сверка видела до прихода — расхождение устарело
+        drift = [(settled.pk, settled.name, Decimal('5'), Decimal('0'))] + command.reconcile('fabric')
+        self.assertEqual(command.repair('fabric', drift), 1)
+        self.assertFalse(MaterialTransaction.objects.filter(fabric=settled, note=ADJUSTMENT_NOTE).exists())
+        self.assertEqual(command.reconcile('fabric'), [])
+
+
+class ApiValidationTests(TestCase):
+    """Неверные фильтры и тела запросов — 400, а не 500."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('api-root'))
+
+    def test_bad_filters(self):
+        for resource, query in (
+            ('logs', {'worker': 'abc'}),
+            ('logs', {'product': '1.5'}),
+            ('logs', {'date_from': '2024-02-30'}),
+            ('material-transactions', {'fabric': 'x'}),
+        ):
+            with self.subTest(resource=resource, query=query):
+                response = self.client.get(reverse('api_list', args=[resource]), query)
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('api_list', args=['logs']), {'worker': '1', 'date_from': '2024-02-01'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_non_object_bodies(self):
+        for resource in ('fabrics', 'products'):
+            for body in ('[1, 2]', '"str"'):
+                with self.subTest(resource=resource, body=body):
+                    response = self.client.post(
+                        reverse('api_list', args=[resource]), body, content_type='application/json',
+                    )
+                    self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse('api_list', args=['material-transactions']),
+            {'fabric': [1], 'transaction_type': 'IN', 'amount': 1}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_logs(self):
+        worker = User.objects.create_user('api-worker')
+        worker.groups.add(Group.objects.get(name='worker'))
+        products = [Product.objects.create(name=f'api product {i}') for i in range(5)]
+        url = reverse('api_bulk', args=['logs'])
+
+        def post(items):
+            return self.client.post(url, json.dumps(items), content_type='application/json')
+
+        items = [{'worker': worker.pk, 'product': product.pk, 'quantity': 1} for product in products]
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(post(items[:1]).status_code, 201)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(post(items).status_code, 201)
+        # работники грузятся одним запросом на пачку, а не на запись
+        def user_queries(context):
+            return sum('FROM "auth_user"' in query['sql'] for query in context.captured_queries)
+        self.assertEqual(user_queries(many), user_queries(few))
+
+        superuser = User.objects.get(username='api-root')
+        response = post([{'worker': superuser.pk, 'product': products[0].pk, 'quantity': 1}])
+        self.assertEqual((response.status_code, response.json()['index']), (400, 0))
+        response = post([{'product': products[0].pk, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=BENCH_CACHES)
+class ProductHistoryBalanceTests(TestCase):
+    """Остаток в истории продукта учитывает выпуск между движениями."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('history-admin')
+        cls.admin.groups.add(Group.objects.get(name='admin'))
+        worker = User.objects.create_user('history-worker')
+        cls.product = Product.objects.create(name='history product')
+        now = timezone.now()
+        receipt = move_product(cls.product, Decimal('10'), ProductTransaction.IN)
+        ProductTransaction.objects.filter(pk=receipt.pk).update(created_at=now - timedelta(days=3))
+        log = log_production(worker, cls.product, 5)
+        WorkerProductLog.objects.filter(pk=log.pk).update(date=timezone.localdate(now - timedelta(days=2)))
+        move_product(cls.product, Decimal('3'), ProductTransaction.OUT)
+        cls.before = timezone.localdate(now - timedelta(days=2)).isoformat()
+
+    def balances(self, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('product_history', args=[self.product.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return [row.balance for row in response.context['transactions']]
+
+    def test_balances(self):
+        self.assertEqual(self.balances(), [12, 10])
+        self.assertEqual(self.balances(before=self.before), [10])
+
+    def test_impossible_before_date_is_ignored(self):
+        self.assertEqual(self.balances(before='2024-02-30'), [12, 10])
+
+
+class StockAtReportTests(TestCase):
+    def test_impossible_date(self):
+        self.client.force_login(User.objects.create_superuser('stock-at-root'))
+        response = self.client.get(reverse('stock_at_report'), {'at': '2024-02-30T10:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['error'])
+
+
+class ImportFileErrorTests(TestCase):
+    """Нечитаемый файл импорта — ошибка формы или команды, а не 500."""
+
+    def test_command_rejects_cp1251_csv(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as fh:
+            fh.write('name,quantity\nТкань,1\n'.encode('cp1251'))
+            fh.flush()
+            with self.assertRaises(CommandError):
+                call_command('import_catalog', 'fabrics', fh.name, stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(Fabric.objects.exists())
+
+    def test_admin_rejects_broken_xlsx(self):
+        self.client.force_login(User.objects.create_superuser('import-root'))
+        upload = SimpleUploadedFile('catalog.xlsx', b'not a zip archive')
+        response = self.client.post(reverse('admin:app_fabric_import'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['file'])
+
+
+@override_settings(CACHES=BENCH_CACHES, SLOW_REQUEST_MS=10_000)
+class ProfilingTests(TestCase):
+    def test_concurrent_record_and_flush(self):
+        errors = []
+
+        def work(index):
+            try:
+                for i in range(300):
+                    profiling.record(f'view-{index}-{i % 50}', 0.001, profiling.RequestProfile(), 10, '/')
+                    if i % 20 == 0:
+                        profiling.flush()
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=work, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_flush_failure_does_not_break_request(self):
+        broken = mock.Mock()
+        broken.set.side_effect = OSError("cache down")
+        with mock.patch.object(profiling, 'cache', broken), mock.patch.object(profiling, '_last_flush', 0):
+            with self.assertLogs('app.profiling', 'ERROR'):
+                profiling.record('view', 0.001, profiling.RequestProfile(), 10, '/')
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    # поток heartbeat пишет своим соединением — нужна закоммиченная задача
+    def test_heartbeat_while_running(self):
+        job = echo_task.delay('beat')
+        jobs.claim('test')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=None)
+        heartbeat = jobs.Heartbeat(job.pk, every=0.01)
+        heartbeat.start()
+        try:
+            for _ in range(200):
+                if Job.objects.filter(pk=job.pk, heartbeat_at__isnull=False).exists():
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            heartbeat.stop()
+        self.assertIsNotNone(Job.objects.get(pk=job.pk).heartbeat_at)
+
+
+class PlanningTests(TestCase):
+    def test_non_positive_quantities_are_skipped(self):
+        matrix = {1: {10: Decimal('2'), 11: Decimal('0')}, 2: {10: Decimal('1')}}
+        stock = {10: Decimal('4'), 11: Decimal('0')}
+        result = planning.plan({1: 1, 2: 0, 3: -5}, matrix=matrix, stock=stock)
+        self.assertEqual([m['fabric_id'] for m in result['materials']], [10])
+        self.assertEqual(result['scale'], 2)
+        self.assertTrue(result['feasible'])
+        self.assertEqual(planning.max_buildable(matrix, stock)[1], (2, 10))
+
+
+@override_settings(CACHES=BENCH_CACHES)
+class DashboardVersionTests(TestCase):
+    def test_bump_never_reuses_version(self):
+        before = dashboard.section_versions()
+        # сброс не читает старое значение: гонка двух сбросов всё равно меняет версию
+        with mock.patch.object(dashboard.cache, 'incr', side_effect=AssertionError), \
+                self.captureOnCommitCallbacks(execute=True):
+            dashboard.bump('fabrics')
+            dashboard.bump('fabrics')
+        after = dashboard.section_versions()
+        self.assertNotEqual(after['fabrics'], before['fabrics'])
+        self.assertEqual(after['products'], before['products'])
+
+
+@override_settings(CACHES=BENCH_CACHES)
+class ConstantQueryCountTests(TestCase):
+    """Число запросов страниц со списками логов не должно зависеть от числа строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser('qc-root', password='qc-password')
+        cls.admin = User.objects.create_user('qc-admin', password='qc-password')
+        cls.admin.groups.add(Group.objects.get(name='admin'))
+        cls.worker = User.objects.create_user('qc-worker', password='qc-password')
+        cls.worker.groups.add(Group.objects.get(name='worker'))
+        cls.product_type = ProductType.objects.create(name='qc type')
+        cls.fabrics = Fabric.objects.bulk_create([Fabric(name=f'qc fabric {i}', price=1) for i in range(12)])
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'qc product {i}', price_per_unit=1, product_type=cls.product_type) for i in range(12)]
+        )
+        cls.added = 0
+
+    def add_rows(self, count):
+        # bulk_create — без сигналов, которые двигали бы склад и сбрасывали кэши
+        rows = range(self.added, self.added + count)
+        self.added += count
+        WorkerProductLog.objects.bulk_create([
+            WorkerProductLog(worker=self.worker, product=self.products[i % 12], product_name='', quantity=1)
+            for i in rows
+        ])
+        FabricChangeLog.objects.bulk_create([
+            FabricChangeLog(fabric=self.fabrics[i % 12], user=self.admin, action='add') for i in rows
+        ])
+        MaterialForProduct.objects.bulk_create([
+            MaterialForProduct(product_type=self.product_type, fabric=self.fabrics[i % 12], quantity=1) for i in rows
+        ])
+
+    def count_queries(self, user, url):
+        self.client.force_login(user)
+        self.client.get(url)  # прогрев кэшей ролей и дашборда
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, user, url):
+        self.add_rows(2)
+        few = self.count_queries(user, url)
+        self.add_rows(8)
+        self.assertEqual(self.count_queries(user, url), few, url)
+
+    def test_worker_home(self):
+        self.assertConstantQueries(self.worker, reverse('home'))
+
+    def test_view_user(self):
+        self.assertConstantQueries(self.admin, reverse('view_user', args=[self.worker.pk]))
+
+    def test_view_product(self):
+        # у одного продукта — логи разных работников
+        workers = User.objects.bulk_create([User(username=f'qc-worker-{i}') for i in range(10)])
+        few = [WorkerProductLog(worker=w, product=self.products[0], product_name='', quantity=1) for w in workers]
+        WorkerProductLog.objects.bulk_create(few[:2])
+        url = reverse('view_product', args=[self.products[0].pk])
+        before = self.count_queries(self.admin, url)
+        WorkerProductLog.objects.bulk_create(few[2:])
+        self.assertEqual(self.count_queries(self.admin, url), before)
+
+    def test_admin_changelists(self):
+        for url in (
+            reverse('admin:app_fabricchangelog_changelist'),
+            reverse('admin:app_workerproductlog_changelist'),
+        ):
+            with self.subTest(url=url):
+                self.assertConstantQueries(self.superuser, url)
+
+
+@override_settings(CACHES=BENCH_CACHES)
+class AsyncViewsTests(TestCase):
+    """Async-варианты (DJANGO_ASYNC_VIEWS=1) отдают те же страницы, что и синхронные view."""
+
+    def setUp(self):
+        benchmark.use_async_views(True)
+        self.addCleanup(benchmark.use_async_views, False)
+
+    async def test_read_views(self):
+        ctx = await sync_to_async(benchmark.fill)(TINY)
+        for scenario in benchmark.SCENARIOS:
+            if scenario.data or scenario.name in ('view_user', 'productivity_report'):
+                continue
+            with self.subTest(scenario.name):
+                client = AsyncClient()
+                await client.aforce_login(await User.objects.aget(username=ctx[scenario.user]))
+                response = await client.get(scenario.url(ctx))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.resolver_match.func.__module__, 'app.async_views')
+
+    @override_settings(CACHES=BENCH_CACHES)
+    async def test_dashboard_fragment_expired_before_render(self):
+        # фрагменты «были в кэше» при проверке и пропали до рендера: блоки грузятся при рендере
+        from . import async_views
+        await Fabric.objects.acreate(name='expired fragment fabric')
+        admin = await User.objects.acreate(username='async-admin')
+        await sync_to_async(admin.groups.add)(await Group.objects.aget(name='admin'))
+        client = AsyncClient()
+        await client.aforce_login(admin)
+        with mock.patch.object(async_views, '_missing_sections', mock.AsyncMock(return_value=set())):
+            response = await client.get(reverse('home'))
+        self.assertContains(response, 'expired fragment fabric')
+
+
+@jobs.task(priority=1)
+def echo_task(value):
+    return value
+
+
+@jobs.task(max_attempts=2, retry_delay=0)
+def failing_task():
+    raise ValueError("sinov xatosi")
+
+
+@jobs.task(priority=5)
+def signal_task():
+    os.kill(os.getpid(), signal.SIGTERM)  # run_worker должен доработать эту задачу и не брать следующую
+    return 'ok'
+
+
+class JobQueueTests(TestCase):
+    def test_claim_by_priority(self):
+        low = echo_task.delay('low')
+        high = jobs.enqueue(echo_task, ['high'], priority=10)
+        self.assertEqual(jobs.claim('test'), high.pk)
+        self.assertEqual(jobs.claim('test'), low.pk)
+        self.assertIsNone(jobs.claim('test'))
+
+    def test_retry_then_fail(self):
+        job = failing_task.delay()
+        with self.assertLogs('app.jobs', 'WARNING'):
+            self.assertEqual(jobs.execute(jobs.claim('test')), Job.QUEUED)
+            self.assertEqual(jobs.execute(jobs.claim('test')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('ValueError', job.error)
+        self.assertIsNone(jobs.claim('test'))
+
+    def test_run_worker_once(self):
+        job = echo_task.delay({'ok': 1})
+        call_command('run_worker', once=True, processes=0, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.DONE, {'ok': 1}))
+
+    def test_requeue_stale_uses_heartbeat(self):
+        long_running = echo_task.delay('long')
+        abandoned = echo_task.delay('abandoned')
+        jobs.claim('test'), jobs.claim('test')
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.update(started_at=hour_ago)
+        Job.objects.filter(pk=abandoned.pk).update(heartbeat_at=hour_ago)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=long_running.pk).status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(pk=abandoned.pk).status, Job.QUEUED)
+
+    def test_run_worker_stops_after_current_job_on_sigterm(self):
+        first = signal_task.delay()
+        second = echo_task.delay('next')
+        call_command('run_worker', processes=0, poll=0.01, stdout=StringIO())
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.DONE)
+        self.assertEqual(Job.objects.get(pk=second.pk).status, Job.QUEUED)
+
+    def test_renditions_bump_dashboard(self):
+        fabric = Fabric.objects.create(name='Rasmli', image='fabrics/rasmli.png')
+        with mock.patch.object(tasks, 'build_renditions', return_value=2), \
+                mock.patch.object(tasks.dashboard, 'bump') as bump:
+            self.assertEqual(tasks.build_image_renditions('app.fabric', fabric.pk), 2)
+        bump.assert_called_once_with('fabrics')
+        fabric.refresh_from_db()
+        self.assertEqual(fabric.image_renditions, 'fabrics/rasmli.png')
+
+    def test_responsive_image_uses_marker_not_storage(self):
+        from .templatetags.image_tags import responsive_image
+        fabric = Fabric(name='Rasmli', image='fabrics/rasmli.png')
+        with mock.patch('django.core.files.storage.default_storage.exists', side_effect=AssertionError):
+            self.assertNotIn('<picture>', responsive_image(fabric.image))
+            fabric.image_renditions = 'fabrics/rasmli.png'
+            self.assertIn('<picture>', responsive_image(fabric.image))
+
+    def test_pages(self):
+        superuser = User.objects.create(username='job-root', is_superuser=True)
+        self.client.force_login(superuser)
+        self.client.post(reverse('job_list'), {'command': 'reconcile_stock'})
+        job = Job.objects.get()
+        self.assertEqual(job.args, ['reconcile_stock'])
+        self.assertEqual(self.client.get(reverse('job_list')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('job_detail', args=[job.pk])).status_code, 200)
+        response = self.client.get(reverse('job_detail', args=[job.pk]), {'format': 'json'})
+        self.assertEqual(response.json()['status'], Job.QUEUED)
+
+
+class WorkerEntrySyncTests(TestCase):
+    """Пакетная синхронизация офлайн-ввода: повтор той же пачки склад не меняет."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user('sync-worker', password='sync-password')
+        cls.worker.groups.add(Group.objects.get(name='worker'))
+        cls.other = User.objects.create_user('sync-other', password='sync-password')
+        cls.other.groups.add(Group.objects.get(name='worker'))
+        plain = ProductType.objects.create(name='sync plain')
+        cls.product = Product.objects.create(name='sync product', price_per_unit=1, product_type=plain)
+        # продукт, на который ткани не хватит
+        heavy = ProductType.objects.create(name='sync heavy')
+        fabric = Fabric.objects.create(name='sync fabric', quantity=1)
+        MaterialForProduct.objects.create(product_type=heavy, fabric=fabric, quantity=5)
+        cls.short = Product.objects.create(name='sync short', price_per_unit=1, product_type=heavy)
+
+    def sync(self, entries):
+        self.client.force_login(self.worker)
+        response = self.client.post(
+            reverse('worker_entry_sync'), json.dumps({'entries': entries}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return {row['key']: row['status'] for row in response.json()['results']}
+
+    def test_retry_is_idempotent(self):
+        entries = [{'key': str(uuid.uuid4()), 'product': self.product.pk, 'quantity': 3} for _ in range(2)]
+        self.assertEqual(set(self.sync(entries).values()), {'created'})
+        self.assertEqual(set(self.sync(entries).values()), {'duplicate'})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 6)
+        self.assertEqual(WorkerProductLog.objects.filter(worker=self.worker).count(), 2)
+
+    def test_shortage_rejects_only_its_entry(self):
+        ok, short, bad = (str(uuid.uuid4()) for _ in range(3))
+        statuses = self.sync([
+            {'key': ok, 'product': self.product.pk, 'quantity': 1},
+            {'key': short, 'product': self.short.pk, 'quantity': 1},
+            {'key': bad, 'product': self.product.pk, 'quantity': 0},
+        ])
+        self.assertEqual(statuses, {ok: 'created', short: 'rejected', bad: 'rejected'})
+        self.assertEqual(WorkerProductLog.objects.count(), 1)
+
+    def test_worker_logs_only_for_self(self):
+        self.sync([{'key': str(uuid.uuid4()), 'product': self.product.pk, 'quantity': 1, 'worker': 'sync-other'}])
+        self.assertEqual(WorkerProductLog.objects.get().worker, self.worker)
+
+    def test_failed_insert_is_not_duplicate(self):
+        # IntegrityError не из-за ключа (продукт удалён параллельно): запись не должна пропасть
+        key = uuid.uuid4()
+        with mock.patch.object(production, 'bulk_log_production', side_effect=IntegrityError('FOREIGN KEY')):
+            results = production.sync_production([(key, self.worker, self.product, 1)])
+        self.assertEqual(results[key][0], production.REJECTED)
+
+    def test_admin_bad_worker_value(self):
+        admin = User.objects.create_user('sync-admin')
+        admin.groups.add(Group.objects.get(name='admin'))
+        self.client.force_login(admin)
+        key = str(uuid.uuid4())
+        response = self.client.post(
+            reverse('worker_entry_sync'),
+            json.dumps({'entries': [{'key': key, 'product': self.product.pk, 'quantity': 1, 'worker': ['x']}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'rejected')
+
+    def test_pages(self):
+        self.client.force_login(self.worker)
+        self.assertContains(self.client.get(reverse('worker_entry')), 'sync product')
+        response = self.client.get(reverse('worker_entry_sw'))
+        self.assertEqual(response['Content-Type'], 'text/javascript')
@@ -1,11 +1,15 @@
 from django.urls import path
+from django.conf import settings
 from django.conf.urls.i18n import set_language
-from . import views
+from . import api, async_views, views
+
+# Читающие страницы под ASGI обслуживают async-варианты (app/async_views.py)
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     # --- Главная ---
-    path('', views.role_based_home, name='home'),
-    path('home/', views.role_based_home, name='home'),
+    path('', read_views.role_based_home, name='home'),
+    path('home/', read_views.role_based_home, name='home'),
 
     # --- Ткани ---
     path('fabric/<int:pk>/', views.view_fabric, name='view_fabric'),
@@ -23,21 +27,44 @@ urlpatterns = [
 
     # --- Работники ---
     path('add_worker_product/', views.add_worker_product, name='add_worker_product'),
+    path('add_worker_product/batch/', views.add_worker_product_batch, name='add_worker_product_batch'),
+    path('add_worker_product/offline/', views.worker_entry, name='worker_entry'),
+    path('add_worker_product/offline/sw.js', views.worker_entry_sw, name='worker_entry_sw'),
+    path('add_worker_product/sync/', views.worker_entry_sync, name='worker_entry_sync'),
 
     # --- Продукты ---
     # path('products/', views.product_list, name='product_list'),
     path('products/add/', views.add_product, name='add_product'),
-    path('products/<int:pk>/', views.view_product, name='view_product'),
+    path('products/<int:pk>/', read_views.view_product, name='view_product'),
     path('products/<int:pk>/edit/', views.edit_product, name='edit_product'),
     path('products/<int:pk>/delete/', views.delete_product, name='delete_product'),
     path('products/<int:pk>/in/', views.products_in, name='product_in'),
     path('products/<int:pk>/out/', views.products_out, name='product_out'),
-    path('products/<int:pk>/history/', views.products_history, name='product_history'),
+    path('products/<int:pk>/history/', read_views.products_history, name='product_history'),
 
     # --- Материалы ---
     path('materials/in/<int:pk>/', views.materials_in, name='materials_in'),
     path('materials/out/<int:pk>/', views.materials_out, name='materials_out'),
-    path('materials/history/<int:pk>/', views.materials_history, name='materials_history'),
+    path('materials/history/<int:pk>/', read_views.materials_history, name='materials_history'),
+
+    # --- Планирование ---
+    path('planning/', views.production_planning, name='production_planning'),
+    path('planning/api/', views.production_planning_api, name='production_planning_api'),
+
+    # --- Отчёты ---
+    path('reports/productivity/', views.productivity_report, name='productivity_report'),
+    path('reports/stock-at/', views.stock_at_report, name='stock_at_report'),
+    path('exports/<str:kind>/', views.ledger_export, name='ledger_export'),
+    path('reports/requests/', views.request_profile, name='request_profile'),
+
+    # --- Фоновые задачи ---
+    path('jobs/', views.job_list, name='job_list'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+
+    # --- JSON API ---
+    path('api/v1/<str:resource>/', api.api_list, name='api_list'),
+    path('api/v1/<str:resource>/bulk/', api.api_bulk, name='api_bulk'),
+    path('api/v1/<str:resource>/<int:pk>/', api.api_detail, name='api_detail'),
 
     # --- Локализация ---
     path('i18n/setlang/', set_language, name='set_language'),
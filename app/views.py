@@ -1,4 +1,9 @@
-from django.http import HttpResponseForbidden
+import csv
+import json
+import uuid
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import login, logout, authenticate
@@ -7,63 +12,112 @@ from django.contrib.auth.models import Group, User
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import PermissionDenied
-from django.utils.timezone import now
-from django.db.models import Q, Sum, Max
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware, now
+from django.db.models import (
+    Q, Sum, Max, Count, F, Value, OuterRef, Subquery, ExpressionWrapper, DecimalField,
+)
+from django.db.models.functions import Coalesce
 from django.db import transaction
 
 
 
-from .models import Fabric, WorkerProductLog, Product, MaterialForProduct, MaterialTransaction, ProductTransaction
-from .decorators import is_admin_or_superuser
-from .forms import FabricForm, MaterialTransactionForm, ProductForm
+from .models import (
+    Fabric, WorkerProductLog, Product, MaterialForProduct, MaterialTransaction, ProductTransaction,
+    ProductProductionStats, ProductType, Job,
+)
+from .decorators import is_admin_or_superuser, has_role
+from . import dashboard, exports, jobs, profiling, reports, snapshots, tasks
+from .alerts import current_alerts
+from .forms import FabricForm, MaterialTransactionForm, ProductForm, WorkerProductLogFormSet
+from .pagination import ledger_page
+from .planning import max_buildable, plan
+from .production import (
+    REJECTED, MaterialShortage, bulk_log_production, log_production, produced_quantity, sync_production,
+)
+from .stock import InsufficientStock, move_fabric, move_product
 
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 
 
-def _admin_only(user):
-    return user.is_superuser or user.groups.filter(name='admin').exists()
+MONEY = DecimalField(max_digits=20, decimal_places=2)
 
 
 # Create your views here.
 
 
-@login_required
-def role_based_home(request):
-    user = request.user
-    products = Product.objects.all()
-
-    # === Считаем агрегаты по логам (количество и последняя дата производства)
-    product_stats = (
-        WorkerProductLog.objects
-        .values('product')  # группировка по продукту
+def _dashboard_products():
+    # Всё считается в SQL: стоимость остатка — выражением, производство — подзапросами к сводке
+    stats = ProductProductionStats.objects.filter(product=OuterRef('pk'))
+    return (
+        Product.objects
+        .only('id', 'name', 'quantity', 'price_per_unit', 'image', 'image_renditions')
         .annotate(
-            total_qty=Sum('quantity'),
-            last_date=Max('date')
+            total_value=ExpressionWrapper(F('price_per_unit') * F('quantity'), output_field=MONEY),  # стоимость остатка
+            stock_qty=F('quantity'),  # остаток на складе
+            total_qty=Coalesce(Subquery(stats.values('total_qty')), 0),  # всего произведено
+            last_produced=Subquery(stats.values('last_date')),
         )
+        .order_by('pk')
     )
-    stats_map = {row['product']: row for row in product_stats}
 
-    # === Заполняем дополнительные поля для каждого продукта
-    for p in products:
-        stat = stats_map.get(p.id)
-        p.total_qty = stat['total_qty'] if stat else 0  # всего произведено
-        p.last_produced = stat['last_date'] if stat else None
-        p.total_value = (p.price_per_unit or 0) * (p.quantity or 0)  # общая стоимость остатка
-        p.stock_qty = p.quantity or 0  # остаток на складе
+
+def _dashboard_fabrics():
+    # Общая стоимость ткани
+    return (
+        Fabric.objects
+        .only('id', 'name', 'quantity', 'price', 'unit', 'image', 'image_renditions', 'created_at')
+        .annotate(total_price=ExpressionWrapper(F('quantity') * F('price'), output_field=MONEY))
+        .order_by('pk')
+    )
+
+
+def _totals_aggregates(price_field):
+    return {
+        'items': Count('pk'),
+        'value': Coalesce(Sum(F('quantity') * F(price_field), output_field=MONEY), Value(Decimal('0')), output_field=MONEY),
+    }
+
+
+def _warehouse_totals(model, price_field):
+    """Итог по складу одним агрегатным запросом: количество позиций и общая стоимость."""
+    return model.objects.aggregate(**_totals_aggregates(price_field))
+
+
+PERIODS = {
+    'week': timedelta(weeks=1),
+    'month': timedelta(days=30),
+    '3months': timedelta(days=90),
+    '6months': timedelta(days=180),
+}
+
+
+def _period_start(period):
+    """Начало периода фильтра логов (?period=week|month|3months|6months); 'all' и прочее — None."""
+    return now() - PERIODS[period] if period in PERIODS else None
+
+
+@login_required
+def role_based_home(request):
+    user = request.user
+
+    # Блоки карточек кэшируются фрагментами ({% cache %}) по версии из app.dashboard —
+    # querysets и итоги ленивые и выполняются только если фрагмента в кэше нет
+    products = _dashboard_products()
+    fabrics = _dashboard_fabrics()
+    totals = {
+        'fabrics': SimpleLazyObject(lambda: _warehouse_totals(Fabric, 'price')),
+        'products': SimpleLazyObject(lambda: _warehouse_totals(Product, 'price_per_unit')),
+    }
 
     # ===== SUPERUSER =====
     if user.is_superuser:
-        admins = Group.objects.get(name='admin').user_set.all()[:3]
-        workers = Group.objects.get(name='worker').user_set.all()[:3]
+        admins = User.objects.filter(groups__name='admin')[:3]
+        workers = User.objects.filter(groups__name='worker')[:3]
         no_role_users = User.objects.filter(groups__isnull=True)[:3]
-        fabrics = Fabric.objects.all()
-
-        # Общая стоимость ткани
-        for fabric in fabrics:
-            qty = Decimal(fabric.quantity or 0)
-            price = fabric.price or Decimal('0.00')
-            fabric.total_price = qty * price
 
         context = {
             'admins': admins,
@@ -71,45 +125,36 @@ def role_based_home(request):
             'fabrics': fabrics,
             'products': products,
             'no_rule_users': no_role_users,
+            'totals': totals,
+            'stock_alerts': current_alerts(),
+            'versions': dashboard.section_versions(),
+            'fragment_timeout': dashboard.FRAGMENT_TIMEOUT,
             'title': f'Superuser page {user.username}',
         }
         return render(request, 'main/for_superuser.html', context)
 
     # ===== ADMIN =====
-    elif user.groups.filter(name='admin').exists():
-        workers = Group.objects.get(name='worker').user_set.all()
-        fabrics = Fabric.objects.all()
-
-        for fabric in fabrics:
-            qty = Decimal(fabric.quantity or 0)
-            price = fabric.price or Decimal('0.00')
-            fabric.total_price = qty * price
+    elif has_role(user, 'admin'):
+        workers = User.objects.filter(groups__name='worker')
 
         context = {
             'title': f'{user.username} page',
             'fabrics': fabrics,
             'workers': workers,
             'products': products,
+            'totals': totals,
+            'stock_alerts': current_alerts(),
+            'versions': dashboard.section_versions(),
+            'fragment_timeout': dashboard.FRAGMENT_TIMEOUT,
         }
         return render(request, 'main/for_admins.html', context)
 
     # ===== WORKER =====
-    elif user.groups.filter(name='worker').exists():
-        logs = WorkerProductLog.objects.filter(worker=user)
+    elif has_role(user, 'worker'):
+        logs = WorkerProductLog.objects.filter(worker=user).select_related('product')
         period = request.GET.get('period', 'all')
 
-        current_time = now()
-        if period == 'week':
-            start_date = current_time - timedelta(weeks=1)
-        elif period == 'month':
-            start_date = current_time - timedelta(days=30)
-        elif period == '3months':
-            start_date = current_time - timedelta(days=90)
-        elif period == '6months':
-            start_date = current_time - timedelta(days=180)
-        else:
-            start_date = None
-
+        start_date = _period_start(period)
         if start_date:
             logs = logs.filter(date__gte=start_date)
 
@@ -137,7 +182,7 @@ def home(request):
 
 
 def sign_up(request):
-    if not (request.user.is_superuser or request.user.groups.filter(name='admin').exists()):
+    if not is_admin_or_superuser(request.user):
         return HttpResponseForbidden("Недостаточно прав.")
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -213,27 +258,21 @@ def manage_users(request):
 @user_passes_test(is_admin_or_superuser)
 def add_product(request):
     if request.method == 'POST':
-        name = request.POST.get('name', '').strip()
-        is_active = bool(request.POST.get('is_active'))
-        price = request.POST.get('price')  # необязательно — если есть поле
-        image = request.FILES.get('image')
-
-        if not name:
-            return render(request, 'product/add_product.html', {
-                'error': 'Название обязательно.'
-            })
-
-        # если в модели Product есть price и image — учитываем
-        kwargs = {'name': name, 'is_active': is_active}
-        if hasattr(Product, 'price_per_unit') and price not in (None, ''):
-            kwargs['price_per_unit'] = price
-        if hasattr(Product, 'image') and image:
-            kwargs['image'] = image
-
-        Product.objects.create(**kwargs)
-        return redirect('home')
+        data = request.POST.copy()
+        if not data.get('price_per_unit'):
+            data['price_per_unit'] = '0'  # цена на странице добавления необязательна
+        form = ProductForm(data, request.FILES)
+        if form.is_valid():
+            form.save()  # миниатюры ставит в очередь ImageRenditionsMixin
+            return redirect('home')
+        return render(request, 'product/add_product.html', {
+            'error': ' '.join(error for errors in form.errors.values() for error in errors),
+            'product_types': ProductType.objects.order_by('name'),
+        })
 
-    return render(request, 'product/add_product.html')
+    return render(request, 'product/add_product.html', {
+        'product_types': ProductType.objects.order_by('name'),
+    })
 from django.db.models import Sum, Max
 from decimal import Decimal
 
@@ -244,35 +283,30 @@ from decimal import Decimal
 def view_product(request, pk):
     product = get_object_or_404(Product, pk=pk)
 
-    # Считаем произведённое
-    total_produced = (
-        WorkerProductLog.objects.filter(product=product)
-        .aggregate(total=Sum('quantity'))['total'] or 0
-    )
+    # Произведённое и дата последнего производства — из сводки
+    stats = ProductProductionStats.objects.filter(product=product).first()
+    total_produced = stats.total_qty if stats else 0
 
-    # Остаток = произведено + текущее количество (если quantity != произведено)
-    current_qty = total_produced + (product.quantity or 0)
+    # Остаток на складе: производство прибавляется к quantity сигналом WorkerProductLog
+    current_qty = product.quantity or 0
 
     # Общая стоимость остатков
     stock_value = current_qty * (product.price_per_unit or 0)
 
-    last_date = (
-        WorkerProductLog.objects.filter(product=product)
-        .order_by('-date')
-        .values_list('date', flat=True)
-        .first()
-    )
+    last_date = stats.last_date if stats else None
 
-    recent_logs = WorkerProductLog.objects.filter(product=product).order_by('-date')[:10]
+    recent_logs = (
+        WorkerProductLog.objects.filter(product=product).select_related('worker').order_by('-date')[:10]
+    )
 
     context = {
         'product': product,
         'total_qty': total_produced,
-        'current_qty': current_qty,  # теперь тут 324
+        'current_qty': current_qty,
         'stock_value': stock_value,
         'last_date': last_date,
         'recent_logs': recent_logs,
-        'can_manage': request.user.is_superuser or request.user.groups.filter(name='admin').exists(),
+        'can_manage': is_admin_or_superuser(request.user),
     }
 
     return render(request, 'product/view_product.html', context)
@@ -330,7 +364,7 @@ def view_user(request, pk):
     # Проверка прав
     if request.user.is_superuser:
         pass
-    elif request.user.groups.filter(name='admin').exists():
+    elif has_role(request.user, 'admin'):
         if user_obj.is_superuser or (group and group.name == 'admin'):
             raise PermissionDenied
     else:
@@ -339,22 +373,10 @@ def view_user(request, pk):
     # Фильтрация логов
     recent_logs = []
     if group and group.name == 'worker':
-        recent_logs = WorkerProductLog.objects.filter(worker=user_obj)
+        recent_logs = WorkerProductLog.objects.filter(worker=user_obj).select_related('worker', 'product')
 
-        period = request.GET.get('period', 'all')
-        current_time = now()
-
-        if period == 'week':
-            start_date = current_time - timedelta(weeks=1)
-            recent_logs = recent_logs.filter(date__gte=start_date)
-        elif period == 'month':
-            start_date = current_time - timedelta(days=30)
-            recent_logs = recent_logs.filter(date__gte=start_date)
-        elif period == '3months':
-            start_date = current_time - timedelta(days=90)
-            recent_logs = recent_logs.filter(date__gte=start_date)
-        elif period == '6months':
-            start_date = current_time - timedelta(days=180)
+        start_date = _period_start(request.GET.get('period', 'all'))
+        if start_date:
             recent_logs = recent_logs.filter(date__gte=start_date)
 
         recent_logs = recent_logs.order_by('-date')
@@ -374,7 +396,7 @@ def edit_user(request, pk):
     # --- ПРАВА ДОСТУПА -----------------------------------------------------
     if request.user.is_superuser:
         can_change_group = True
-    elif request.user.groups.filter(name='admin').exists():
+    elif has_role(request.user, 'admin'):
         # нельзя редактировать суперюзера или админа
         if user_obj.is_superuser or (current_group and current_group.name == 'admin'):
             raise PermissionDenied
@@ -509,7 +531,7 @@ def add_worker_product(request):
     worker_username = request.GET.get('worker')
     target_user = None
 
-    if current_user.is_superuser or current_user.groups.filter(name='admin').exists():
+    if is_admin_or_superuser(current_user):
         if worker_username:
             target_user = User.objects.filter(username=worker_username).first()
         worker_group = Group.objects.filter(name='worker').first()
@@ -523,7 +545,7 @@ def add_worker_product(request):
 
     if request.method == 'POST':
         # целевой работник
-        if current_user.is_superuser or current_user.groups.filter(name='admin').exists():
+        if is_admin_or_superuser(current_user):
             worker_username = request.POST.get('worker') or worker_username
             target_user = User.objects.filter(username=worker_username).first()
             if not target_user:
@@ -542,12 +564,18 @@ def add_worker_product(request):
         product_name_fallback = request.POST.get('product_name')  # вдруг добавишь поле вручную
         quantity = request.POST.get('quantity') or 0
 
-        WorkerProductLog.objects.create(
-            worker=target_user,
-            product=product_obj,
-            product_name=product_name_fallback or (product_obj.name if product_obj else ''),
-            quantity=quantity,
-        )
+        try:
+            log_production(
+                target_user, product_obj, quantity,
+                user=current_user, product_name=product_name_fallback,
+            )
+        except MaterialShortage as exc:
+            return render(request, 'main/add_worker_product.html', {
+                'error': f"Не хватает материалов: {exc}",
+                'workers': workers,
+                'products': products,
+                'target_user': target_user,
+            })
         return redirect('home')
 
     return render(request, 'main/add_worker_product.html', {
@@ -557,6 +585,109 @@ def add_worker_product(request):
     })
 
 
+@user_passes_test(is_admin_or_superuser)
+def add_worker_product_batch(request):
+    """Пакетный ввод производства за смену (много строк одним POST)."""
+    if request.method == 'POST':
+        formset = WorkerProductLogFormSet(request.POST)
+        if formset.is_valid():
+            try:
+                created = bulk_log_production(formset.entries(), user=request.user)
+            except MaterialShortage as exc:
+                formset.non_form_errors().append(f"Не хватает материалов: {exc}")
+            else:
+                messages.success(request, f"Сохранено записей: {len(created)}.")
+                return redirect('home')
+    else:
+        formset = WorkerProductLogFormSet()
+
+    return render(request, 'main/add_worker_product_batch.html', {'formset': formset})
+
+
+# Офлайн-ввод производства: записи копятся в IndexedDB браузера и уходят пачками
+SYNC_BATCH_MAX = 100
+
+
+@login_required
+def worker_entry(request):
+    """Лёгкая страница ввода для цеха: работает без сети, синхронизируется сама."""
+    workers = None
+    if is_admin_or_superuser(request.user):
+        workers = User.objects.filter(groups__name='worker').order_by('username').values_list('username', flat=True)
+    return render(request, 'main/worker_entry.html', {
+        'products': list(Product.objects.filter(is_active=True).order_by('name').values_list('pk', 'name')),
+        'workers': workers,
+        'batch_size': SYNC_BATCH_MAX,
+    })
+
+
+def worker_entry_sw(request):
+    """Service worker страницы ввода: отдаёт её из кэша, когда сети нет."""
+    response = render(request, 'main/worker_entry_sw.js', content_type='text/javascript')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _sync_entry(row, user, products, workers):
+    """Разобрать одну запись пачки: (key, worker, product, quantity) или ошибка ValueError."""
+    try:
+        key = uuid.UUID(str(row['key']))
+        quantity = int(row['quantity'])
+        product = products[int(row['product'])]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Неверная запись")
+    if quantity < 1:
+        raise ValueError("Количество должно быть больше нуля")
+    worker = user
+    if workers is not None:
+        username = row.get('worker')
+        worker = workers.get(username) if isinstance(username, str) else None
+        if worker is None:
+            raise ValueError("Работник не найден")
+    return key, worker, product, quantity
+
+
+@login_required
+@require_POST
+def worker_entry_sync(request):
+    """
+    Приём пачки офлайн-записей: {"entries": [{"key": uuid, "product": id, "quantity": n, "worker": username}]}.
+    Ответ — статус каждой записи: created, duplicate (уже была принята) или rejected (с причиной);
+    принятые и повторные браузер удаляет из очереди, отклонённые показывает работнику.
+    """
+    try:
+        rows = json.loads(request.body)['entries']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Ожидается JSON с полем entries"}, status=400)
+    if not isinstance(rows, list) or len(rows) > SYNC_BATCH_MAX:
+        return JsonResponse({'error': f"Не больше {SYNC_BATCH_MAX} записей за раз"}, status=400)
+    rows = [row for row in rows if isinstance(row, dict)]
+
+    products = Product.objects.filter(is_active=True).in_bulk(
+        [row['product'] for row in rows if str(row.get('product', '')).isdigit()]
+    )
+    workers = None
+    if is_admin_or_superuser(request.user):  # работника выбирает админ; работник пишет только себе
+        workers = User.objects.filter(groups__name='worker').in_bulk(
+            [row['worker'] for row in rows if isinstance(row.get('worker'), str)], field_name='username',
+        )
+
+    results, entries = [], []
+    for row in rows:
+        try:
+            entry = _sync_entry(row, request.user, products, workers)
+        except ValueError as exc:
+            results.append({'key': str(row.get('key')), 'status': REJECTED, 'error': str(exc)})
+        else:
+            entries.append(entry)
+
+    synced = sync_production(entries, user=request.user)
+    for key, *_ in entries:
+        status, error = synced[key]
+        results.append({'key': str(key), 'status': status, 'error': error})
+    return JsonResponse({'results': results})
+
+
 
 
 @login_required
@@ -584,18 +715,7 @@ def materials_in(request, pk):
             return redirect('materials_in', pk=fabric.pk)
 
         # атомарно: обновляем склад + пишем транзакцию
-        with transaction.atomic():
-            fabric.refresh_from_db()  # на случай параллельных операций
-            fabric.quantity = (fabric.quantity or Decimal('0')) + amount
-            fabric.save()
-
-            MaterialTransaction.objects.create(
-                fabric=fabric,
-                user=request.user,
-                transaction_type=MaterialTransaction.IN,
-                amount=amount,
-                note=note or "Приход вручную",
-            )
+        move_fabric(fabric, amount, MaterialTransaction.IN, user=request.user, note=note or "Приход вручную")
 
         messages.success(
             request,
@@ -630,27 +750,14 @@ def materials_out(request, pk):
             messages.error(request, "Количество должно быть больше нуля.")
             return redirect('materials_out', pk=fabric.pk)
 
-        with transaction.atomic():
-            fabric.refresh_from_db()
-            current_qty = fabric.quantity or Decimal('0')
-
-            if amount > current_qty:
-                messages.error(
-                    request,
-                    f"Нельзя списать {amount} — доступно только {current_qty} {fabric.get_unit_display()}.",
-                )
-                return redirect('materials_out', pk=fabric.pk)
-
-            fabric.quantity = current_qty - amount
-            fabric.save()
-
-            MaterialTransaction.objects.create(
-                fabric=fabric,
-                user=request.user,
-                transaction_type=MaterialTransaction.OUT,
-                amount=amount,
-                note=note or "Списание вручную",
+        try:
+            move_fabric(fabric, amount, MaterialTransaction.OUT, user=request.user, note=note or "Списание вручную")
+        except InsufficientStock as exc:
+            messages.error(
+                request,
+                f"Нельзя списать {amount} — доступно только {exc.available} {fabric.get_unit_display()}.",
             )
+            return redirect('materials_out', pk=fabric.pk)
 
         messages.success(
             request,
@@ -667,11 +774,18 @@ def materials_out(request, pk):
 @login_required
 def materials_history(request, pk):
     fabric = get_object_or_404(Fabric, pk=pk)
-    transactions = fabric.transactions.select_related('user').all()  # thanks related_name
+    transactions, next_cursor = ledger_page(
+        fabric.transactions.select_related('user'),  # thanks related_name
+        fabric.quantity,
+        cursor=request.GET.get('cursor'),
+        before=request.GET.get('before'),
+    )
 
     return render(request, 'materials/materials_history.html', {
         'fabric': fabric,
         'transactions': transactions,
+        'next_cursor': next_cursor,
+        'before': request.GET.get('before', ''),
     })
 
 
@@ -686,22 +800,17 @@ from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 
 from .models import Product, WorkerProductLog, ProductTransaction
+
+
 @login_required
 def products_in(request, pk):
     product = get_object_or_404(Product, pk=pk)
 
-    # Всего произведено работниками
-    total_produced = (
-        WorkerProductLog.objects
-        .filter(product=product)
-        .aggregate(total=Sum('quantity'))['total'] or 0
-    )
-    # Уже оприходовано (текущее наличие на складе)
+    # Произведённое уже на складе (его прибавляет лог производства); здесь — прочий приход,
+    # например возврат. Ограничение «не больше произведённого» снято намеренно: оно имело
+    # смысл, пока остаток считался как произведено + quantity. Всего произведено — для информации.
+    total_produced = produced_quantity(product.pk)
     current_qty = product.quantity or Decimal('0')
-    # Сколько ещё можно перенести на склад
-    available_to_add = Decimal(total_produced) - current_qty
-    if available_to_add < 0:
-        available_to_add = Decimal('0')
 
     if request.method == 'POST':
         raw_value = (request.POST.get('value') or '').strip()
@@ -728,36 +837,14 @@ def products_in(request, pk):
 
         amount = Decimal(amount_int)
 
-        with transaction.atomic():
-            product_locked = Product.objects.select_for_update().get(pk=product.pk)
-
-            # Повторный расчёт внутри транзакции — защита от гонок
-            total_produced_locked = (
-                WorkerProductLog.objects
-                .filter(product=product_locked)
-                .aggregate(total=Sum('quantity'))['total'] or 0
-            )
-            current_qty_locked = product_locked.quantity or Decimal('0')
-            available_locked = Decimal(total_produced_locked) - current_qty_locked
-            if amount > available_locked:
-                messages.error(request, f"Нельзя оприходовать {amount}. Доступно только {available_locked}.")
-                return redirect('product_in', pk=product_locked.pk)
-
-            product_locked.quantity = current_qty_locked + amount
-            product_locked.save(update_fields=['quantity'])
-
-            ProductTransaction.objects.create(
-                product=product_locked,
-                user=request.user,
-                transaction_type=ProductTransaction.IN,
-                amount=amount,
-                note=note or "Приход (из произведённого)"
-            )
+        new_qty = move_product(
+            product, amount, ProductTransaction.IN, user=request.user, note=note or "Приход",
+        ).balance
 
         messages.success(
             request,
             f"Оприходовано {amount} {product.get_unit_display()} «{product.name}». "
-            f"На складе теперь: {product_locked.quantity}."
+            f"На складе теперь: {new_qty}."
         )
         return redirect('product_history', pk=product.pk)
 
@@ -765,7 +852,6 @@ def products_in(request, pk):
         'product': product,
         'total_produced': total_produced,
         'current_qty': current_qty,
-        'available_to_add': available_to_add,
     })
     
     
@@ -776,12 +862,7 @@ def products_out(request, pk):
     current_qty = product.quantity or Decimal('0')
 
     # Для информативности показываем общее производство
-    from django.db.models import Sum
-    total_produced = (
-        WorkerProductLog.objects
-        .filter(product=product)
-        .aggregate(total=Sum('quantity'))['total'] or 0
-    )
+    total_produced = produced_quantity(product.pk)
 
     if request.method == 'POST':
         raw_value = (request.POST.get('value') or '').strip()
@@ -811,27 +892,15 @@ def products_out(request, pk):
             messages.error(request, f"Нельзя списать {amount}. Доступно {current_qty}.")
             return redirect('product_out', pk=product.pk)
 
-        with transaction.atomic():
-            product_locked = Product.objects.select_for_update().get(pk=product.pk)
-            locked_qty = product_locked.quantity or Decimal('0')
-            if amount > locked_qty:
-                messages.error(request, f"Недостаточно на складе (доступно {locked_qty}).")
-                return redirect('product_out', pk=product_locked.pk)
-
-            product_locked.quantity = locked_qty - amount
-            product_locked.save(update_fields=['quantity'])
-
-            ProductTransaction.objects.create(
-                product=product_locked,
-                user=request.user,
-                transaction_type=ProductTransaction.OUT,
-                amount=amount,
-                note=note or "Расход"
-            )
+        try:
+            new_qty = move_product(product, amount, ProductTransaction.OUT, user=request.user, note=note or "Расход").balance
+        except InsufficientStock as exc:
+            messages.error(request, f"Недостаточно на складе (доступно {exc.available}).")
+            return redirect('product_out', pk=product.pk)
 
         messages.success(
             request,
-            f"Списано {amount} {product.get_unit_display()} «{product.name}». Остаток: {product_locked.quantity}."
+            f"Списано {amount} {product.get_unit_display()} «{product.name}». Остаток: {new_qty}."
         )
         return redirect('product_history', pk=product.pk)
 
@@ -846,20 +915,231 @@ def products_out(request, pk):
 @login_required
 def products_history(request, pk):
     product = get_object_or_404(Product, pk=pk)
-    transactions = (
-        ProductTransaction.objects
-        .filter(product=product)
-        .select_related('user')
-        .order_by('-created_at')
+    transactions, next_cursor = ledger_page(
+        ProductTransaction.objects.filter(product=product).select_related('user'),
+        product.quantity,
+        cursor=request.GET.get('cursor'),
+        before=request.GET.get('before'),
+        production=WorkerProductLog.objects.filter(product=product),
     )
     return render(request, 'product/product_history.html', {
         'product': product,
-        'transactions': transactions
+        'transactions': transactions,
+        'next_cursor': next_cursor,
+        'before': request.GET.get('before', ''),
     })
 
-    product = get_object_or_404(Product, pk=pk)
-    transactions = ProductTransaction.objects.filter(product=product).select_related('user').order_by('-created_at')
-    return render(request, 'product/product_history.html', {
-        'product': product,
-        'transactions': transactions
-    })
\ No newline at end of file
+
+def _parse_mix(pairs):
+    """[('3', '10'), ...] → {3: 10}; пустые и неположительные количества пропускаются."""
+    mix = {}
+    for product_id, qty in pairs:
+        try:
+            product_id, qty = int(product_id), int(qty)
+        except (TypeError, ValueError):
+            continue
+        if qty > 0:
+            mix[product_id] = mix.get(product_id, 0) + qty
+    return mix
+
+
+def _planning_data(mix):
+    products = Product.objects.filter(is_active=True).only('pk', 'name', 'unit').order_by('name')
+    fabric_names = dict(Fabric.objects.values_list('pk', 'name'))
+
+    buildable = max_buildable()
+    rows = []
+    for p in products:
+        qty, limiting = buildable.get(p.pk, (None, None))
+        rows.append({
+            'id': p.pk,
+            'name': p.name,
+            'unit': p.get_unit_display(),
+            'max_buildable': qty,
+            'limiting_fabric': fabric_names.get(limiting),
+            'requested': mix.get(p.pk, 0),
+        })
+
+    result = None
+    if mix:
+        result = plan(mix)
+        for m in result['materials']:
+            m['fabric'] = fabric_names.get(m['fabric_id'])
+        result['limiting_fabric'] = fabric_names.get(result['limiting_fabric_id'])
+    return rows, result
+
+
+@user_passes_test(is_admin_or_superuser)
+def production_planning(request):
+    """Что можно собрать из текущих остатков и хватит ли ткани на заданный набор."""
+    mix = _parse_mix(
+        (key[len('qty_'):], value) for key, value in request.GET.items() if key.startswith('qty_')
+    )
+    rows, result = _planning_data(mix)
+    return render(request, 'planning/planning.html', {'rows': rows, 'plan': result})
+
+
+@user_passes_test(is_admin_or_superuser)
+def production_planning_api(request):
+    """JSON: ?mix=<product_id>:<qty>&mix=... — то же, что страница планирования."""
+    mix = _parse_mix(item.split(':', 1) for item in request.GET.getlist('mix') if ':' in item)
+    rows, result = _planning_data(mix)
+    if result:
+        result['scale'] = float(result['scale']) if result['scale'] is not None else None
+        for m in result['materials']:
+            for key in ('required', 'available', 'shortfall'):
+                m[key] = str(m[key])
+    return JsonResponse({'products': rows, 'plan': result})
+
+
+def _report_params(request):
+    """Параметры отчёта из GET: период по умолчанию — последние 4 недели по неделям."""
+    today = now().date()
+    try:
+        date_to = date.fromisoformat(request.GET.get('date_to') or today.isoformat())
+        date_from = date.fromisoformat(request.GET.get('date_from') or (date_to - timedelta(weeks=4)).isoformat())
+    except ValueError:
+        date_to, date_from = today, today - timedelta(weeks=4)
+    if date_from > date_to:
+        date_from, date_to = date_to, date_from
+    bucket = request.GET.get('bucket')
+    if bucket not in reports.BUCKETS:
+        bucket = 'week'
+    try:
+        worker_id = int(request.GET['worker'])
+    except (KeyError, ValueError):
+        worker_id = None
+    return date_from, date_to, bucket, worker_id
+
+
+@user_passes_test(is_admin_or_superuser)
+def productivity_report(request):
+    """Выработка и сдельный заработок работников по дням / неделям / месяцам (+ выгрузка CSV)."""
+    date_from, date_to, bucket, worker_id = _report_params(request)
+    rows = reports.productivity(date_from, date_to, bucket, worker_id=worker_id)
+
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = (
+            f'attachment; filename="productivity_{bucket}_{date_from}_{date_to}.csv"'
+        )
+        response.write('\ufeff')  # BOM — чтобы Excel открыл UTF-8 без вопросов
+        writer = csv.writer(response)
+        writer.writerow(['period', 'worker', 'product', 'quantity', 'earnings'])
+        for row in rows:
+            writer.writerow([row['period'], row['worker'], row['product'], row['quantity'], row['earnings']])
+        return response
+
+    return render(request, 'reports/productivity.html', {
+        'rows': rows,
+        'totals': reports.worker_totals(rows),
+        'workers': User.objects.filter(groups__name='worker').only('pk', 'username').order_by('username'),
+        'date_from': date_from,
+        'date_to': date_to,
+        'bucket': bucket,
+        'buckets': (('day', 'Kun'), ('week', 'Hafta'), ('month', 'Oy')),
+        'worker_id': worker_id,
+    })
+
+
+def _iso_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+@user_passes_test(is_admin_or_superuser)
+def ledger_export(request, kind):
+    """Выгрузка журнала движений (materials / products) потоком: ?format=csv|xlsx&date_from&date_to&item&type."""
+    if kind not in exports.LEDGERS:
+        raise Http404
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        fmt = 'csv'
+    transaction_type = request.GET.get('type')
+    item = request.GET.get('item', '')
+    filters = {
+        'date_from': _iso_date(request.GET.get('date_from')),
+        'date_to': _iso_date(request.GET.get('date_to')),
+        'item': int(item) if item.isdigit() else None,
+        'transaction_type': transaction_type if transaction_type in ('IN', 'OUT') else None,
+    }
+    if request.GET.get('background'):
+        # большая выгрузка — файлом через очередь, страница задачи покажет ссылку
+        job = jobs.enqueue(tasks.export_ledger_file, (kind, fmt), filters, user=request.user)
+        return redirect('job_detail', pk=job.pk)
+    response = StreamingHttpResponse(exports.export(kind, fmt, **filters), content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}_ledger_{now():%Y%m%d}.{fmt}"'
+    return response
+
+
+@user_passes_test(is_admin_or_superuser)
+def stock_at_report(request):
+    """Остатки всех тканей и продуктов на выбранный момент (?at=YYYY-MM-DDTHH:MM)."""
+    error = None
+    try:
+        at = parse_datetime(request.GET.get('at') or '')
+    except ValueError:  # формат верный, а даты нет: 2024-02-30T10:00
+        at, error = None, "Bunday sana yo'q — hozirgi qoldiq ko'rsatildi."
+    if at is None:
+        at = now().replace(second=0, microsecond=0)
+    elif is_naive(at):
+        at = make_aware(at)
+    report = snapshots.stock_at(at)
+    return render(request, 'reports/stock_at.html', {
+        'error': error,
+        'at': at,
+        'fabrics': report['fabric'],
+        'products': report['product'],
+    })
+
+
+@user_passes_test(is_superuser)
+def request_profile(request):
+    """Перцентили времени, числа SQL, рендера и размера ответа по каждому view (все процессы)."""
+    return render(request, 'reports/request_profile.html', {
+        'views': profiling.summary(),
+        'slow_ms': settings.SLOW_REQUEST_MS,
+    })
+
+
+@user_passes_test(is_admin_or_superuser)
+def job_list(request):
+    """Очередь фоновых задач; суперпользователь может запустить служебную команду."""
+    if request.method == 'POST':
+        if not request.user.is_superuser:
+            raise PermissionDenied
+        command = request.POST.get('command')
+        if command not in tasks.MAINTENANCE_COMMANDS:
+            raise Http404
+        job = jobs.enqueue(tasks.run_command, (command,), user=request.user)
+        return redirect('job_detail', pk=job.pk)
+
+    status = request.GET.get('status', '')
+    queryset = Job.objects.select_related('user').order_by('-pk')
+    if status in dict(Job.STATUSES):
+        queryset = queryset.filter(status=status)
+    counts = dict(Job.objects.values_list('status').annotate(n=Count('pk')).order_by())
+    return render(request, 'jobs/job_list.html', {
+        'jobs': queryset[:100],
+        'statuses': [(value, label, counts.get(value, 0)) for value, label in Job.STATUSES],
+        'selected_status': status,
+        'commands': tasks.MAINTENANCE_COMMANDS,
+    })
+
+
+@user_passes_test(is_admin_or_superuser)
+def job_detail(request, pk):
+    """Состояние задачи; ?format=json — для опроса из скриптов."""
+    job = get_object_or_404(Job.objects.select_related('user'), pk=pk)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.pk,
+            'name': job.name,
+            'status': job.status,
+            'attempts': job.attempts,
+            'result': job.result,
+            'error': job.error.splitlines()[-1] if job.error else '',
+        })
+    return render(request, 'jobs/job_detail.html', {'job': job})
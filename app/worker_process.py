@@ -0,0 +1,15 @@
+"""
+Инициализация процессов пула run_worker. Модуль не импортирует модели: spawn загружает
+его в свежем интерпретаторе до django.setup().
+"""
+import signal
+
+import django
+
+
+def init():
+    # Ctrl-C и SIGTERM получает вся группа процессов; остановкой управляет родитель —
+    # он перестаёт брать задачи и ждёт, пока дочерние доработают уже взятые
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    django.setup()
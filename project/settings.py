@@ -52,12 +52,14 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
 MIDDLEWARE = [
+    'app.middleware.RequestProfilerMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.UserRolesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,7 +68,8 @@ ROOT_URLCONF = 'project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # обычный DjangoTemplates + замер времени рендера для RequestProfilerMiddleware
+        'BACKEND': 'app.profiling.ProfilingDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,18 +77,65 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'app.context_processors.user_roles',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'project.wsgi.application'
+ASGI_APPLICATION = 'project.asgi.application'
+
+# Под ASGI-сервером (uvicorn/daphne: project.asgi:application) дашборды, карточку продукта
+# и истории отдают async-варианты view. Под WSGI держите выключенным: там async view
+# выполнялись бы через async_to_sync с лишними переключениями потоков.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Соединение живёт DB_CONN_MAX_AGE секунд и проверяется перед повторным использованием,
+# а не открывается на каждый запрос. Для PostgreSQL (DATABASE_URL=postgres://...) при
+# DB_POOL_MAX_SIZE > 0 вместо этого включается пул psycopg (Django требует CONN_MAX_AGE=0).
+
 DATABASES = {
-    'default': dj_database_url.config(default='sqlite:///db.sqlite3')
+    'default': dj_database_url.config(
+        default='sqlite:///db.sqlite3',
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        conn_health_checks=True,
+    )
+}
+
+# SQLite: ожидание блокировки вместо «database is locked», транзакции сразу берут
+# блокировку записи (IMMEDIATE), чтобы не упираться в её повышение. Режим журнала WAL
+# (читатели не ждут писателя) хранится в самом файле базы — его один раз включает
+# миграция 0026_sqlite_wal, а не каждое соединение.
+SQLITE_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', '20')),  # секунд, это busy_timeout
+}
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update(SQLITE_OPTIONS)
+elif DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '0'))
+    if DB_POOL_MAX_SIZE:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        }
+
+# Cache
+# Файловый кэш общий для всех воркеров gunicorn на одной машине: фрагменты дашборда,
+# роли, алерты. Можно заменить через DJANGO_CACHE_BACKEND / DJANGO_CACHE_LOCATION.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
 }
 
 # Password validation
@@ -132,6 +182,35 @@ LOGOUT_REDIRECT_URL = '/login'
 
 LOGIN_URL = '/login/'
 
+# Сколько секунд хранить роли пользователя в кэше между запросами (0 — только в пределах запроса)
+ROLE_CACHE_TIMEOUT = int(os.environ.get('ROLE_CACHE_TIMEOUT', 0))
+
+# Низкие остатки: окно расчёта расхода и горизонт «скоро закончится» (в днях)
+LOW_STOCK_WINDOW_DAYS = 30
+LOW_STOCK_HORIZON_DAYS = 7
+
+# Профилирование запросов (app.middleware.RequestProfilerMiddleware): SQL, шаблоны, размер ответа по view.
+# Медленные запросы (дольше SLOW_REQUEST_MS) пишутся в лог 'app.profiling' вместе с самыми долгими SQL.
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', '1') == '1'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+
+# Фоновые задачи (app.jobs) выполняет manage.py run_worker — в продакшене он должен быть
+# запущен рядом с веб-сервером: без него, например, не нарезаются копии загруженных изображений
+# и страницы показывают оригиналы. JOBS_EAGER=1 — выполнять задачи сразу после коммита
+# в процессе запроса: для разработки и CI без запущенного воркера.
+JOBS_EAGER = os.environ.get('JOBS_EAGER', '0') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app': {'handlers': ['console'], 'level': os.environ.get('APP_LOG_LEVEL', 'INFO')},
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 